@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_current_admin_user
+from app.db.base import get_db
+from app.services.admin_service import admin_service
+from app.schemas.auth import User
+from app.schemas.ticket import BulkStatusResult, BulkStatusUpdate, ImportResult
+
+router = APIRouter()
+
+@router.get("/export")
+async def export_tickets(
+    gzip: bool = False,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Stream every ticket with its messages as NDJSON, one ticket per line.
+
+    Pass `gzip=true` to download a gzip compressed file instead.
+    """
+    if gzip:
+        return StreamingResponse(
+            admin_service.export_tickets(gzipped=True),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="tickets.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        admin_service.export_tickets(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="tickets.ndjson"'}
+    )
+
+@router.post("/import", response_model=ImportResult)
+async def import_tickets(
+    request: Request,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Bulk import tickets with their messages from NDJSON in the export format.
+
+    The body is read as a stream and inserted in batched transactions. Send
+    gzip compressed data with `Content-Encoding: gzip` or as `application/gzip`.
+    """
+    gzipped = (
+        request.headers.get("content-encoding") == "gzip"
+        or request.headers.get("content-type") == "application/gzip"
+    )
+    return await admin_service.import_tickets(request.stream(), gzipped=gzipped)
+
+@router.post("/tickets/status", response_model=BulkStatusResult)
+async def bulk_update_status(
+    bulk_update: BulkStatusUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Move every ticket in `from_status` to `to_status` in one statement, e.g.
+    close all tickets resolved more than `older_than_days` days ago
+    """
+    return await admin_service.bulk_update_status(db, bulk_update)
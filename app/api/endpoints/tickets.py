@@ -1,38 +1,68 @@
-from typing import List
+import asyncio
+import json
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, Query, Response, status, BackgroundTasks
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_active_user, get_current_admin_user
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user
+from app.core.http_cache import etag_matches
+from app.core.rate_limit import ai_response_rate_limiter, message_rate_limiter
 from app.db.base import get_db
-from app.db.repositories.ticket_repository import ticket_repository
+from app.db.notifications import message_broker
+from app.services.stream_store import response_stream_store
 from app.services.ticket_service import ticket_service
-from app.services.ai_service import ai_service
 from app.schemas.auth import User
 from app.schemas.ticket import Ticket, TicketCreate, TicketUpdate, TicketWithMessages
 from app.schemas.message import Message, MessageCreate
 
 router = APIRouter()
 
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def _format_sse(data: str) -> str:
+    """Frame a chunk as an SSE event, one data line per line of text"""
+    return "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
+
 @router.get("/", response_model=List[Ticket])
 async def get_tickets(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    ticket_status: Optional[str] = Query(None, alias="status"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get all tickets for the current user
+    Get the current user's tickets, newest first.
+    
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page; the header is absent on the last page. Send the `ETag` back
+    in `If-None-Match` to get a 304 when nothing changed.
     """
-    return await ticket_service.get_user_tickets(
-        db, current_user.id, skip=skip, limit=limit
+    etag = await ticket_service.get_tickets_etag(
+        db, current_user.id, limit=limit, cursor=cursor, status=ticket_status
+    )
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    tickets, next_cursor = await ticket_service.get_user_tickets(
+        db, current_user.id, limit=limit, cursor=cursor, status=ticket_status
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return tickets
 
 @router.post("/", response_model=Ticket)
 async def create_ticket(
     ticket_in: TicketCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -43,64 +73,162 @@ async def create_ticket(
 @router.get("/{ticket_id}", response_model=TicketWithMessages)
 async def get_ticket(
     ticket_id: UUID,
-    db: Session = Depends(get_db),
+    response: Response,
+    message_limit: int = Query(50, ge=1, le=500),
+    before: Optional[str] = None,
+    after_id: Optional[UUID] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get a specific ticket with messages
+    Get a specific ticket with a window of its messages, oldest first.
+    
+    By default the newest `message_limit` messages are returned. Pass
+    `messages_cursor` back as `before` to page through older messages, or
+    pass the id of the last message you have as `after_id` to fetch only
+    newer ones. Send the `ETag` back in `If-None-Match` to get a 304 when
+    nothing changed.
     """
-    return await ticket_service.get_ticket(db, ticket_id, current_user.id)
+    # Cheap version check first, so unchanged polls never load messages;
+    # without a validator to compare, the view is a single statement
+    if if_none_match:
+        etag = await ticket_service.get_ticket_etag(
+            db, ticket_id, current_user, message_limit=message_limit, before=before, after_id=after_id
+        )
+        if etag and etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+    
+    ticket, etag = await ticket_service.get_ticket(
+        db,
+        ticket_id,
+        current_user,
+        message_limit=message_limit,
+        before=before,
+        after_id=after_id
+    )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return ticket
+
+@router.patch("/{ticket_id}", response_model=Ticket)
+async def update_ticket(
+    ticket_id: UUID,
+    ticket_in: TicketUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Update a ticket's title, description or status
+    """
+    return await ticket_service.update_ticket(db, ticket_id, ticket_in, current_user)
 
 @router.post("/{ticket_id}/messages", response_model=Message)
 async def add_message(
     ticket_id: UUID,
     message: MessageCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Add a message to a ticket
     """
-    return await ticket_service.add_message(db, ticket_id, message, current_user.id)
+    message_rate_limiter.check(current_user.id)
+    return await ticket_service.add_message(
+        db, ticket_id, message, current_user, background_tasks=background_tasks
+    )
 
 @router.get("/{ticket_id}/ai-response")
 async def get_ai_response(
     ticket_id: UUID,
-    db: Session = Depends(get_db),
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Stream an AI response for a ticket using Server-Sent Events
+    Stream an AI response for a ticket using Server-Sent Events.
+    
+    Every chunk carries an event id. Reconnecting with `Last-Event-ID`
+    replays the chunks missed since then and continues with the live
+    generation, without starting a new one.
     """
-    ticket = ticket_repository.get(db, id=ticket_id)
-    if not ticket:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ticket not found"
-        )
+    ticket = await ticket_service.get_visible_ticket(db, ticket_id, current_user)
     
-    # Check if user has access to this ticket
-    if str(ticket.user_id) != str(current_user.id) and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    resumed = response_stream_store.resume(ticket_id, last_event_id)
+    if resumed:
+        ai_stream, start = resumed
+    else:
+        # Resuming is free, only new requests count against the rate limit
+        ai_response_rate_limiter.check(current_user.id)
+        built = await ticket_service.build_prompt(db, ticket)
+        ai_stream = ticket_service.start_ai_response(ticket, built)
+        start = 0
+        headers["X-Prompt-Tokens"] = str(built.prompt_tokens)
+    # Hand the connection back to the pool for the life of the stream
+    await db.close()
     
-    messages = ticket_repository.get_messages(db, ticket_id=ticket_id)
+    # Surface a generation that was shed or failed upfront as a proper
+    # status code rather than an empty event stream
+    await ai_stream.ready()
     
     async def event_generator():
-        async for chunk in ai_service.stream_response(ticket, messages):
-            yield f"data: {chunk}\n\n"
-        
-        # Save the complete response to the database after streaming
-        complete_response = await ai_service.generate_response(ticket, messages)
-        ai_message = MessageCreate(content=complete_response, is_ai=True)
-        ticket_repository.add_message(db, ticket_id=ticket_id, message=ai_message)
+        # The reply is persisted by the generation itself once complete, so
+        # the saved message is exactly the text streamed to the client
+        async for index, chunk in ai_stream.subscribe(start):
+            yield f"id: {ai_stream.id}:{index}\n" + _format_sse(chunk)
         
         yield "data: [DONE]\n\n"
     
     return StreamingResponse(
         event_generator(),
-        media_type="text/event-stream"
-    )
\ No newline at end of file
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+@router.get("/{ticket_id}/events")
+async def get_ticket_events(
+    ticket_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Push new messages on a ticket using Server-Sent Events.
+    
+    Each event carries the message as JSON, with the message id as the event
+    id. A client that falls too far behind, or that may have missed events
+    while the server was reconnecting, receives a `resync` event and is
+    disconnected; it should catch up with `GET /tickets/{ticket_id}?after_id=`
+    and subscribe again.
+    """
+    subscription = await ticket_service.subscribe_to_ticket(db, ticket_id, current_user)
+    # Subscribers can stay connected for hours, don't hold a pooled connection
+    await db.close()
+    
+    async def event_generator():
+        try:
+            while True:
+                if subscription.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.NOTIFY_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Woken up to resync
+                    continue
+                yield f"event: message\nid: {event['id']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            message_broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class TTLCache(Generic[K, V]):
+    """
+    In-process LRU cache whose entries also expire after a fixed TTL.
+
+    Bounded to `max_size` entries; the least recently used entry is evicted
+    first. `on_evict` is called with the key and value of every entry that
+    is evicted or found expired, but not of those invalidated or cleared.
+    Not thread safe, intended for use from the event loop only.
+    """
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl: float,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+        self._hits = metrics.counter(f"{name}_cache_hits_total", f"{name} cache hits")
+        self._misses = metrics.counter(f"{name}_cache_misses_total", f"{name} cache misses")
+        self._evictions = metrics.counter(
+            f"{name}_cache_evictions_total", f"{name} cache entries evicted or expired"
+        )
+        metrics.gauge(f"{name}_cache_size", f"{name} cache entries", callback=lambda: len(self))
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses.inc()
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._evictions.inc()
+            self._misses.inc()
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted, (_, evicted_value) = self._entries.popitem(last=False)
+            self._evictions.inc()
+            if self.on_evict is not None:
+                self.on_evict(evicted, evicted_value)
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def hits(self) -> float:
+        return self._hits.value()
+
+    @property
+    def misses(self) -> float:
+        return self._misses.value()
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Verified principals by user id, so authenticated requests skip the user lookup
+principal_cache: TTLCache = TTLCache(
+    "principal",
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
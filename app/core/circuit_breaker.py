@@ -0,0 +1,67 @@
+import time
+
+from app.core.metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+circuit_state_gauge = metrics.gauge(
+    "circuit_breaker_open", "Whether a circuit breaker is open (1) or letting calls through (0)",
+    labelnames=("name",)
+)
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after `failure_threshold` consecutive failures.
+
+    Once open, calls are refused for `reset_timeout` seconds; after that a
+    single trial call is let through, which closes the breaker again if it
+    succeeds or reopens it if it fails.
+    """
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        circuit_state_gauge.set(0, name=name)
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a trial call through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def available(self) -> bool:
+        """Whether `allow` would let a call through, without claiming the trial call"""
+        return self.state == CLOSED or (self.state == OPEN and self.retry_after == 0)
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; claims the trial call when half open"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.retry_after == 0:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a claimed trial call that was abandoned before it finished"""
+        if self.state == HALF_OPEN:
+            # Still past the reset timeout, so the next call gets the trial
+            self.state = OPEN
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            circuit_state_gauge.set(0, name=self.name)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            circuit_state_gauge.set(1, name=self.name)
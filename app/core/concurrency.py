@@ -0,0 +1,129 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+class OverloadedError(Exception):
+    """Raised when work is shed instead of queued; mapped to a fast HTTP error"""
+    def __init__(self, detail: str, retry_after: float = 1.0, status_code: int = 503):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+class ConcurrencyLimiter:
+    """
+    Caps how many callers hold a slot at once.
+
+    At most `max_concurrency` callers run at once and at most `max_queue` wait
+    for a slot; callers beyond that, or that wait longer than `queue_timeout`,
+    get an OverloadedError straight away instead of piling up.
+    """
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.running = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        metrics.gauge(
+            f"{name}_queue_depth", f"Calls waiting for a {name} slot",
+            callback=lambda: self.waiting
+        )
+        metrics.gauge(
+            f"{name}_in_flight", f"Calls currently holding a {name} slot",
+            callback=lambda: self.running
+        )
+        self._latency = metrics.histogram(
+            f"{name}_seconds", f"Time spent running {name} calls"
+        )
+        self._wait_time = metrics.histogram(
+            f"{name}_wait_seconds", f"Time spent waiting for a {name} slot"
+        )
+        self._rejected = metrics.counter(
+            f"{name}_rejected_total", f"{name} calls rejected because all slots were busy"
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the body of the block, shedding load when the queue is full"""
+        if self._slots is None:
+            # Created lazily so the semaphore binds to the running loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        slots = self._slots
+
+        if slots.locked() and self.waiting >= self.max_queue:
+            self._rejected.inc()
+            raise OverloadedError(f"{self.name} is saturated", retry_after=self.queue_timeout)
+
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected.inc()
+            raise OverloadedError(f"{self.name} is saturated", retry_after=self.queue_timeout)
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self._wait_time.observe(started_at - queued_at)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            slots.release()
+            self._latency.observe(time.perf_counter() - started_at)
+
+    def reset(self) -> None:
+        """Forget the semaphore, e.g. when the event loop it was bound to is gone"""
+        self._slots = None
+
+class BoundedExecutor:
+    """
+    Runs blocking, CPU-bound calls in a dedicated thread pool, admitting
+    callers through a ConcurrencyLimiter sized to the pool.
+    """
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        queue_timeout: float
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.limiter = ConcurrencyLimiter(name, max_workers, max_queue, queue_timeout)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` on the pool, shedding load when the queue is full"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix=self.name
+            )
+
+        async with self.limiter.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.limiter.reset()
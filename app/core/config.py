@@ -17,16 +17,133 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     
+    # Password hashing pool (bcrypt is CPU bound and runs off the event loop)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    
+    # Cache of authenticated users; the TTL bounds how stale a role or
+    # is_active flag can be when it is changed outside this process
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    
     # Database
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "postgres")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "support_assistant")
-    DATABASE_URI: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}/{POSTGRES_DB}"
+    DATABASE_URI: str = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}/{POSTGRES_DB}"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Create missing tables on startup; turn off when the schema is created
+    # by `python -m app.db.init_db` or migrations
+    DB_CREATE_SCHEMA: bool = True
+    DB_POOL_WARM_SIZE: int = 5  # connections opened concurrently on startup
+    
+    # Startup steps that need the database retry in the background until
+    # they succeed; /health/ready reports 503 meanwhile. Boot waits up to
+    # STARTUP_WAIT_SECONDS for them before serving anyway
+    STARTUP_WAIT_SECONDS: float = 10.0
+    STARTUP_RETRY_MAX_SECONDS: float = 30.0
+    READINESS_TIMEOUT_SECONDS: float = 2.0
     
     # Groq API
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+    GROQ_API_URL: str = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+    
+    # Shared HTTP connection pool for the LLM provider
+    LLM_POOL_SIZE: int = 100
+    LLM_POOL_SIZE_PER_HOST: int = 20
+    LLM_KEEPALIVE_SECONDS: float = 30.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_READ_TIMEOUT_SECONDS: float = 30.0  # max gap between streamed chunks
+    LLM_TOTAL_TIMEOUT_SECONDS: float = 300.0
+    
+    # Optional second provider or model for hedged requests and failover;
+    # setting only the model reuses the Groq endpoint and key
+    LLM_FALLBACK_API_URL: str = os.getenv("LLM_FALLBACK_API_URL", "")
+    LLM_FALLBACK_API_KEY: str = os.getenv("LLM_FALLBACK_API_KEY", "")
+    LLM_FALLBACK_MODEL: str = os.getenv("LLM_FALLBACK_MODEL", "")
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS: float = 20.0
+    LLM_FALLBACK_FIRST_TOKEN_TIMEOUT_SECONDS: float = 20.0
+    
+    # Fire the fallback when the primary has not produced a token within its
+    # recent p95 time to first token (or the initial delay until it has history)
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.25
+    LLM_HEDGE_INITIAL_DELAY_SECONDS: float = 2.0
+    
+    # Stop calling a provider after consecutive failures
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    
+    # Admission control for upstream LLM calls, per worker
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_QUEUE: int = 64
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    
+    # Per-user rate limits on LLM-backed endpoints
+    AI_RESPONSE_RATE_PER_MINUTE: float = 10.0
+    AI_RESPONSE_BURST: int = 5
+    MESSAGE_RATE_PER_MINUTE: float = 30.0
+    MESSAGE_BURST: int = 10
+    RATE_LIMIT_MAX_USERS: int = 100000
+    
+    # Prompt budget; older turns beyond it are folded into a rolling summary
+    PROMPT_MAX_TOKENS: int = 3000
+    PROMPT_SUMMARY_MAX_TOKENS: int = 500
+    
+    # Generated replies shared between identical prompts
+    AI_RESPONSE_CACHE_TTL_SECONDS: float = 300.0
+    AI_RESPONSE_CACHE_MAX_SIZE: int = 1000
+    
+    # Background AI drafts generated when a customer posts a message
+    AI_DRAFTS_ENABLED: bool = True
+    AI_DRAFT_WORKERS: int = 4
+    AI_DRAFT_MAX_QUEUE: int = 1000
+    AI_DRAFT_MAX_ATTEMPTS: int = 3
+    AI_DRAFT_RETRY_BACKOFF_SECONDS: float = 1.0
+    AI_DRAFT_TTL_SECONDS: float = 3600.0
+    
+    # Push delivery of new messages: postgres (LISTEN/NOTIFY) or memory (single process)
+    NOTIFY_BACKEND: str = os.getenv("NOTIFY_BACKEND", "postgres")
+    NOTIFY_SUBSCRIBER_QUEUE_SIZE: int = 100
+    NOTIFY_HEARTBEAT_SECONDS: float = 15.0
+    
+    # Buffered AI streams that clients can resume with Last-Event-ID
+    AI_STREAM_STORE_MAX_BYTES: int = 50_000_000
+    AI_STREAM_STORE_TTL_SECONDS: float = 600.0
+    
+    # Similarity index of resolved tickets: near-identical questions reuse
+    # the earlier answer, close ones get it as context in the prompt
+    SIMILARITY_INDEX_ENABLED: bool = True
+    SIMILARITY_DIM: int = 512
+    SIMILARITY_INDEX_MAX_SIZE: int = 20000  # 40 MB of float32 at 512 dims
+    SIMILARITY_ANSWER_THRESHOLD: float = 0.9
+    SIMILARITY_CONTEXT_THRESHOLD: float = 0.6
+    # Status changes made through other workers show up after at most this long
+    SIMILARITY_INDEX_RELOAD_SECONDS: float = 300.0
+    
+    # Bulk export and import
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched per server-side cursor round-trip
+    IMPORT_BATCH_SIZE: int = 5000  # rows inserted per transaction
+    
+    # Write-behind batching of message inserts
+    MESSAGE_WRITE_BEHIND_ENABLED: bool = False
+    MESSAGE_WRITE_DURABLE_ACK: bool = True  # respond only once the message is committed
+    MESSAGE_WRITE_BATCH_SIZE: int = 100
+    MESSAGE_WRITE_FLUSH_SECONDS: float = 0.01
+    MESSAGE_WRITE_MAX_BUFFER: int = 10000
+    
+    # Observability
+    METRICS_ENABLED: bool = True
+    DB_SLOW_QUERY_SECONDS: float = 0.5
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.1
+    
+    # What to do with an in-flight AI reply when the client disconnects: persist, cancel
+    AI_STREAM_DISCONNECT_POLICY: str = os.getenv("AI_STREAM_DISCONNECT_POLICY", "persist")
     
     class Config:
         case_sensitive = True
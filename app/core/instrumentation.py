@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Time to serve a request, until the response body is sent",
+    labelnames=("method", "route", "status")
+)
+requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "Requests currently being served"
+)
+query_seconds = metrics.histogram(
+    "db_query_seconds", "Time spent executing a single SQL statement",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+queries_per_request = metrics.histogram(
+    "db_queries_per_request", "SQL statements executed while serving a request",
+    labelnames=("route",), buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+db_seconds_per_request = metrics.histogram(
+    "db_seconds_per_request", "Time spent in SQL while serving a request",
+    labelnames=("route",)
+)
+slow_queries = metrics.counter(
+    "db_slow_queries_total", "SQL statements slower than DB_SLOW_QUERY_SECONDS"
+)
+event_loop_lag = metrics.histogram(
+    "event_loop_lag_seconds", "How late a periodic timer fired, i.e. how long the event loop was busy",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+class RequestStats:
+    """Database work done on behalf of the current request"""
+    __slots__ = ("path", "queries", "db_seconds")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Mutable per-request holder; tasks spawned by the request share it
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class MetricsMiddleware:
+    """
+    Records a latency histogram per route template, plus the number of SQL
+    statements and the time spent in them. Plain ASGI, so it adds no
+    per-request objects beyond the stats holder.
+    """
+    def __init__(self, app: Callable):
+        self.app = app
+        self._routes: Optional[Dict[Any, str]] = None
+
+    def _route_of(self, scope: Dict[str, Any]) -> str:
+        # Label by template, not raw path, to keep the number of series bounded
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["path"])
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            requests_in_flight.dec()
+            current_request.reset(token)
+
+            route = self._route_of(scope)
+            request_seconds.observe(elapsed, method=scope["method"], route=route, status=str(status_code))
+            queries_per_request.observe(stats.queries, route=route)
+            db_seconds_per_request.observe(stats.db_seconds, route=route)
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Count and time every statement run on `engine`, logging slow ones"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        query_seconds.observe(elapsed)
+
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+        if elapsed >= settings.DB_SLOW_QUERY_SECONDS:
+            slow_queries.inc()
+            logger.warning(
+                "Slow query (%.1f ms) serving %s: %s",
+                elapsed * 1000,
+                stats.path if stats is not None else "background task",
+                " ".join(statement.split())[:500]
+            )
+
+class EventLoopMonitor:
+    """
+    Wakes up every `interval` seconds and records how late it woke. Blocking
+    calls on the loop delay every request and stream on the worker by the
+    same amount.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected_at = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            event_loop_lag.observe(max(0.0, loop.time() - expected_at))
+
+# Initialize the monitor
+event_loop_monitor = EventLoopMonitor(interval=settings.EVENT_LOOP_LAG_INTERVAL_SECONDS)
@@ -0,0 +1,27 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+# Keyset position: the (created_at, id) of the last row on the previous page
+CursorPosition = Tuple[datetime, UUID]
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Encode a keyset position as an opaque, URL-safe token"""
+    raw = f"{created_at.isoformat()}|{id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> CursorPosition:
+    """Decode a token produced by encode_cursor, rejecting malformed input with a 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+
+from app.core.concurrency import OverloadedError
+from app.core.config import settings
+from app.core.metrics import metrics
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets: each key may burst up to `burst` requests and is
+    then refilled at `rate` requests per second.
+
+    Buckets are kept for at most `max_keys` keys, least recently used first
+    out; a forgotten key simply starts again with a full bucket.
+    """
+    def __init__(self, name: str, rate: float, burst: int, max_keys: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Any, Tuple[float, float]]" = OrderedDict()
+
+        metrics.gauge(
+            f"{name}_rate_limit_keys", f"Keys with a {name} token bucket",
+            callback=lambda: len(self._buckets)
+        )
+        self._limited = metrics.counter(
+            f"{name}_rate_limited_total", f"{name} requests rejected by the per-user rate limit"
+        )
+
+    def check(self, key: Any) -> None:
+        """Take a token for `key`, raising a 429 OverloadedError when none is left"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self._limited.inc()
+            raise OverloadedError(
+                "Too many requests",
+                retry_after=(1 - tokens) / self.rate,
+                status_code=429
+            )
+
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+# Initialize the limiters
+ai_response_rate_limiter = TokenBucketLimiter(
+    "ai_response",
+    rate=settings.AI_RESPONSE_RATE_PER_MINUTE / 60,
+    burst=settings.AI_RESPONSE_BURST,
+    max_keys=settings.RATE_LIMIT_MAX_USERS,
+)
+message_rate_limiter = TokenBucketLimiter(
+    "message",
+    rate=settings.MESSAGE_RATE_PER_MINUTE / 60,
+    burst=settings.MESSAGE_BURST,
+    max_keys=settings.RATE_LIMIT_MAX_USERS,
+)
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """
+    Runs the startup steps that need the database in the background,
+    retrying with backoff, so a worker boots and answers liveness probes
+    during a database outage. It reports ready once they have succeeded.
+    """
+    def __init__(self, max_retry_interval: float, check_timeout: float):
+        self.max_retry_interval = max_retry_interval
+        self.check_timeout = check_timeout
+        self.ready = False
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._created_at = time.perf_counter()
+
+        self._time_to_ready = metrics.gauge(
+            "startup_time_to_ready_seconds", "Seconds from import until startup finished"
+        )
+
+    def start(self, initialize: Callable[[], Awaitable[None]]) -> None:
+        """Run `initialize` until it succeeds; it must be safe to repeat"""
+        if self._task is None:
+            # Not ready until this run's steps have succeeded, even when restarted
+            self.ready = False
+            self._task = asyncio.create_task(self._run(initialize))
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for startup to finish; True when ready"""
+        if self._task is not None and not self.ready and timeout > 0:
+            await asyncio.wait({self._task}, timeout=timeout)
+        return self.ready
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, initialize: Callable[[], Awaitable[None]]) -> None:
+        delay = 0.5
+        while True:
+            try:
+                await initialize()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("Startup failed, retrying in %.1f s: %s", delay, self.last_error)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+                continue
+
+            self.ready = True
+            self.last_error = None
+            elapsed = time.perf_counter() - self._created_at
+            self._time_to_ready.set(elapsed)
+            logger.info("Ready %.2f s after import", elapsed)
+            return
+
+    async def check(self, bind: AsyncEngine) -> Optional[str]:
+        """Return why the worker cannot serve traffic, or None when it can"""
+        if not self.ready:
+            return f"Starting up: {self.last_error}" if self.last_error else "Starting up"
+        try:
+            async with bind.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=self.check_timeout)
+        except Exception as e:
+            return f"Database unavailable: {type(e).__name__}"
+        return None
+
+# Initialize the readiness state
+readiness = Readiness(
+    max_retry_interval=settings.STARTUP_RETRY_MAX_SECONDS,
+    check_timeout=settings.READINESS_TIMEOUT_SECONDS,
+)
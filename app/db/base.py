@@ -1,21 +1,64 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 
-# Create SQLAlchemy engine
-engine = create_engine(settings.DATABASE_URI)
+def make_engine(database_uri: str) -> AsyncEngine:
+    """
+    Create an async engine for `database_uri`.
+    
+    In-memory SQLite (`sqlite+aiosqlite://`) gets a single shared connection,
+    so every session sees the same database for the life of the engine.
+    """
+    url = make_url(database_uri)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return create_async_engine(
+                url, poolclass=StaticPool, connect_args={"check_same_thread": False}
+            )
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+# Create SQLAlchemy async engine
+engine = make_engine(settings.DATABASE_URI)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit so responses can be built without reloading
+SessionLocal = async_sessionmaker(
+    bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 # Create base class for models
 Base = declarative_base()
 
+async def create_schema(bind: AsyncEngine = engine) -> None:
+    """Create any missing tables; existing tables are left untouched"""
+    import app.db.models  # noqa: F401 (registers the tables on Base)
+    
+    async with bind.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def warm_pool(size: int, bind: AsyncEngine = engine) -> None:
+    """Open `size` pooled connections at once, so first requests skip the connect"""
+    if isinstance(bind.pool, StaticPool):
+        # One shared connection, opened on first use
+        return
+    
+    async def connect() -> None:
+        async with bind.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    await asyncio.gather(*(connect() for _ in range(size)))
+
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+Create the database schema, as an explicit deployment step:
+
+    python -m app.db.init_db
+
+Run it once before starting the API with DB_CREATE_SCHEMA=false.
+"""
+import asyncio
+
+from app.db.base import create_schema, engine
+
+async def main() -> None:
+    try:
+        await create_schema()
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import insert, update
+
+from app.core.concurrency import OverloadedError
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.base import SessionLocal
+from app.db.models import Message, Ticket
+from app.db.notifications import message_broker, message_event
+from app.schemas.message import MessageCreate
+
+logger = logging.getLogger(__name__)
+
+Pending = Tuple[Dict[str, Any], Optional[asyncio.Future]]
+
+class MessageWriter:
+    """
+    Write-behind buffer for new messages.
+
+    Messages are queued in memory and written by a single flusher as one
+    multi-row INSERT ... RETURNING per batch, in one transaction, once
+    `batch_size` messages are waiting or `flush_interval` seconds after the
+    first one arrived. Ids and timestamps are assigned on submit from a
+    monotonic clock, so messages keep their submission order per ticket.
+
+    Durable submits return once their batch has committed; non-durable
+    submits return straight away and are lost if the process dies first.
+    """
+    def __init__(self, batch_size: int, flush_interval: float, max_buffer: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Pending] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_created_at = datetime.min
+
+        metrics.gauge(
+            "message_write_buffer", "Messages waiting to be written",
+            callback=lambda: len(self._buffer)
+        )
+        self._batch_sizes = metrics.histogram(
+            "message_write_batch_size", "Messages written per INSERT batch",
+            buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+        )
+        self._commits = metrics.counter(
+            "message_write_commits_total", "Transactions committed by the message writer"
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher after writing everything still buffered"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._wakeup.set()
+        await task
+
+    def _next_created_at(self) -> datetime:
+        # Strictly increasing, so (created_at, id) order is submission order
+        now = max(datetime.utcnow(), self._last_created_at + timedelta(microseconds=1))
+        self._last_created_at = now
+        return now
+
+    async def submit(
+        self,
+        ticket_id: UUID,
+        message: MessageCreate,
+        durable: bool = True,
+        generated: bool = False
+    ) -> Message:
+        """Queue a message, waiting for it to commit when `durable`"""
+        if len(self._buffer) >= self.max_buffer:
+            raise OverloadedError("Message writer is saturated", retry_after=self.flush_interval)
+
+        row = {
+            **message.model_dump(),
+            "id": uuid.uuid4(),
+            "ticket_id": ticket_id,
+            "generated": generated,
+            "created_at": self._next_created_at(),
+        }
+        future = asyncio.get_running_loop().create_future() if durable else None
+        self._buffer.append((row, future))
+        if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+        if future is None:
+            return Message(**row)
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            stopping = self._task is None
+            if not stopping and len(self._buffer) < self.batch_size:
+                # Give the batch a moment to fill up
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+            while self._buffer:
+                batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+                await self._flush(batch)
+            if stopping or self._task is None:
+                return
+
+    async def _flush(self, batch: List[Pending]) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            async with SessionLocal() as db:
+                result = await db.scalars(
+                    insert(Message).returning(Message, sort_by_parameter_order=True),
+                    rows
+                )
+                messages = result.all()
+                # Bump every ticket in the batch so versions and ETags move on
+                await db.execute(
+                    update(Ticket)
+                    .where(Ticket.id.in_({row["ticket_id"] for row in rows}))
+                    .values(updated_at=datetime.utcnow())
+                )
+                events = [message_event(message) for message in messages]
+                await message_broker.before_commit(db, events)
+                await db.commit()
+        except Exception as e:
+            logger.exception("Writing a batch of %d messages failed", len(batch))
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        self._commits.inc()
+        self._batch_sizes.observe(len(batch))
+        message_broker.after_commit(events)
+        for message, (_, future) in zip(messages, batch):
+            if future is not None and not future.done():
+                future.set_result(message)
+
+# Initialize the writer
+message_writer = MessageWriter(
+    batch_size=settings.MESSAGE_WRITE_BATCH_SIZE,
+    flush_interval=settings.MESSAGE_WRITE_FLUSH_SECONDS,
+    max_buffer=settings.MESSAGE_WRITE_MAX_BUFFER,
+)
@@ -1,16 +1,16 @@
 import uuid
 from datetime import datetime
 from typing import List
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String, Text, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, String, Text, Enum
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
+from app.db.types import GUID
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="user")
@@ -23,30 +23,58 @@ class User(Base):
 class Ticket(Base):
     __tablename__ = "tickets"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
     status = Column(String, default="open")  # open, in_progress, resolved, closed
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Rolling summary of the turns that no longer fit in the AI prompt
+    summary = Column(Text, nullable=True)
+    summarized_until = Column(DateTime, nullable=True)  # created_at of the last summarized message
+    
+    # Set when staff moved the ticket to a resolved status; only those
+    # tickets vouch for their AI reply being reused for other customers
+    resolved_by_staff = Column(Boolean, default=False, nullable=False)
+    
     # Foreign Keys
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    user_id = Column(GUID(), ForeignKey("users.id"))
     
     # Relationships
     user = relationship("User", back_populates="tickets")
-    messages = relationship("Message", back_populates="ticket", cascade="all, delete-orphan")
+    messages = relationship(
+        "Message",
+        back_populates="ticket",
+        cascade="all, delete-orphan",
+        order_by="Message.created_at"
+    )
+    
+    __table_args__ = (
+        # Serves keyset pagination of a user's tickets ordered by (created_at, id)
+        Index("ix_tickets_user_id_created_at", "user_id", "created_at"),
+        # Serves the similarity index's most recently resolved tickets and
+        # bulk status moves of stale tickets
+        Index("ix_tickets_status_updated_at", "status", "updated_at"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     content = Column(Text, nullable=False)
     is_ai = Column(Boolean, default=False)
+    # Set by the server on replies it generated, never from client input
+    generated = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Foreign Keys
-    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"))
+    ticket_id = Column(GUID(), ForeignKey("tickets.id"))
     
     # Relationships
-    ticket = relationship("Ticket", back_populates="messages")
\ No newline at end of file
+    ticket = relationship("Ticket", back_populates="messages")
+    
+    __table_args__ = (
+        # Serves windowed and keyset-paginated reads of a ticket's conversation
+        Index("ix_messages_ticket_id_created_at", "ticket_id", "created_at"),
+    )
\ No newline at end of file
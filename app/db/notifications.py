@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ticket_messages"
+
+# NOTIFY payloads are limited to 8000 bytes; larger messages are sent by id
+# and loaded once per worker by the listener
+MAX_INLINE_PAYLOAD_BYTES = 7000
+
+delivered_counter = metrics.counter(
+    "ticket_events_delivered_total", "Ticket message events queued for subscribers"
+)
+overflow_counter = metrics.counter(
+    "ticket_events_overflow_total", "Subscribers disconnected for falling too far behind"
+)
+
+class Subscription:
+    """One client's bounded queue of events for a single ticket"""
+    def __init__(self, ticket_id: UUID, max_queue: int):
+        self.ticket_id = ticket_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+            delivered_counter.inc()
+        except asyncio.QueueFull:
+            # A slow consumer must not hold up everyone else; cut it off and
+            # let the client resync from its last seen message
+            self.overflowed = True
+            overflow_counter.inc()
+
+    def resync(self) -> None:
+        """Cut the client off so it catches up from the last message it saw"""
+        self.overflowed = True
+        # Wake a consumer waiting on an empty queue; a full one wakes anyway
+        if self.queue.empty():
+            self.queue.put_nowait(None)
+
+class MessageBroker:
+    """
+    Fans new ticket messages out to subscribers connected to this worker.
+
+    This base class delivers within the process only, which is what tests
+    and single-worker deployments need. Repositories call `before_commit`
+    inside the transaction that inserts messages and `after_commit` once
+    they are durable, each with all the events of that transaction.
+    """
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._subscribers: Dict[UUID, Set[Subscription]] = {}
+        metrics.gauge(
+            "ticket_event_subscribers", "Clients subscribed to ticket events on this worker",
+            callback=lambda: sum(len(subs) for subs in self._subscribers.values())
+        )
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def subscribe(self, ticket_id: UUID) -> Subscription:
+        subscription = Subscription(ticket_id, self.max_queue)
+        self._subscribers.setdefault(ticket_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.ticket_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.ticket_id]
+
+    def resync_all(self) -> None:
+        """Make every subscriber catch up, e.g. after events may have been lost"""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.resync()
+
+    def has_subscribers(self, ticket_id: UUID) -> bool:
+        return ticket_id in self._subscribers
+
+    def fan_out(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to every local subscriber of its ticket"""
+        for subscription in list(self._subscribers.get(UUID(event["ticket_id"]), ())):
+            subscription.offer(event)
+
+    async def before_commit(self, db: AsyncSession, events: List[Dict[str, Any]]) -> None:
+        pass
+
+    def after_commit(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            self.fan_out(event)
+
+class PostgresMessageBroker(MessageBroker):
+    """
+    Publishes with NOTIFY inside the inserting transaction, so events are
+    only sent for committed messages, and keeps one LISTEN connection per
+    worker that fans each notification out to its local subscribers.
+    """
+    def __init__(self, dsn: str, max_queue: int):
+        super().__init__(max_queue)
+        self.dsn = dsn
+        self._connection = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        # Strong references so pending loads are not garbage collected
+        self._loading: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        if self._connection is None:
+            await self._connect()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(self._on_connection_lost)
+        await self._connection.add_listener(CHANNEL, self._on_notification)
+
+    def _on_connection_lost(self, connection) -> None:
+        if not self._stopping:
+            logger.warning("Lost the %s LISTEN connection, reconnecting", CHANNEL)
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 0.5
+        while not self._stopping:
+            try:
+                await self._connect()
+            except Exception:
+                logger.exception("Reconnecting the %s LISTEN connection failed", CHANNEL)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            # Notifications sent while nobody was listening are lost; now
+            # that the listener is back, subscribers catch up with `after_id`
+            logger.info("Reconnected the %s LISTEN connection, resyncing subscribers", CHANNEL)
+            self.resync_all()
+            return
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        for task in self._loading:
+            task.cancel()
+        await asyncio.gather(*self._loading, return_exceptions=True)
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        # A JSON array of events, all from one transaction
+        for event in json.loads(payload):
+            if not self.has_subscribers(UUID(event["ticket_id"])):
+                continue
+            if "content" in event:
+                self.fan_out(event)
+            else:
+                task = asyncio.create_task(self._load_and_fan_out(event))
+                self._loading.add(task)
+                task.add_done_callback(self._loading.discard)
+
+    async def _load_and_fan_out(self, event: Dict[str, Any]) -> None:
+        from app.db.base import SessionLocal
+        from app.db.models import Message
+
+        async with SessionLocal() as db:
+            message = await db.scalar(select(Message).where(Message.id == UUID(event["id"])))
+        if message is not None:
+            self.fan_out(message_event(message))
+
+    async def before_commit(self, db: AsyncSession, events: List[Dict[str, Any]]) -> None:
+        # One statement per transaction; a batch only takes more than one
+        # notification when it does not fit in a single payload
+        await db.execute(
+            text(
+                "SELECT pg_notify(:channel, payload) "
+                "FROM unnest(CAST(:payloads AS text[])) AS payload"
+            ),
+            {"channel": CHANNEL, "payloads": pack_payloads(events)}
+        )
+
+    def after_commit(self, events: List[Dict[str, Any]]) -> None:
+        # Delivered to every worker, this one included, by the listener
+        pass
+
+def pack_payloads(events: List[Dict[str, Any]]) -> List[str]:
+    """Pack events into as few JSON array payloads as the size limit allows"""
+    payloads: List[str] = []
+    batch: List[str] = []
+    size = 2
+    for event in events:
+        encoded = json.dumps(event)
+        if len(encoded.encode("utf-8")) + 2 > MAX_INLINE_PAYLOAD_BYTES:
+            encoded = json.dumps({"id": event["id"], "ticket_id": event["ticket_id"]})
+        length = len(encoded.encode("utf-8")) + 1
+        if batch and size + length > MAX_INLINE_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += length
+    if batch:
+        payloads.append("[" + ",".join(batch) + "]")
+    return payloads
+
+def message_event(message: Any) -> Dict[str, Any]:
+    """The event payload published for a new message"""
+    return {
+        "id": str(message.id),
+        "ticket_id": str(message.ticket_id),
+        "content": message.content,
+        "is_ai": message.is_ai,
+        "created_at": message.created_at.isoformat(),
+    }
+
+def _create_broker() -> MessageBroker:
+    # LISTEN/NOTIFY needs PostgreSQL; other databases deliver in-process
+    if settings.NOTIFY_BACKEND == "postgres" and settings.DATABASE_URI.startswith("postgresql"):
+        dsn = settings.DATABASE_URI.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return PostgresMessageBroker(dsn, max_queue=settings.NOTIFY_SUBSCRIBER_QUEUE_SIZE)
+    return MessageBroker(max_queue=settings.NOTIFY_SUBSCRIBER_QUEUE_SIZE)
+
+# Initialize the broker
+message_broker = _create_broker()
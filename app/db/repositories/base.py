@@ -1,7 +1,8 @@
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.base import Base
 
 # Define types for SQLAlchemy model and Pydantic schema
@@ -19,21 +20,23 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         """
         Get a record by ID
         """
-        return db.query(self.model).filter(self.model.id == id).first()
+        result = await db.execute(select(self.model).where(self.model.id == id))
+        return result.scalars().first()
 
-    def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
         """
         Get multiple records
         """
-        return db.query(self.model).offset(skip).limit(limit).all()
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return result.scalars().all()
     
-    def create(self, db: Session, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> ModelType:
+    async def create(self, db: AsyncSession, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> ModelType:
         """
         Create a new record
         """
@@ -43,13 +46,13 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
     
-    def update(
+    async def update(
         self,
-        db: Session,
+        db: AsyncSession,
         *,
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
@@ -57,24 +60,24 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         Update a record
         """
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+            update_data = obj_in.model_dump(exclude_unset=True)
+        columns = self.model.__table__.columns
+        for field, value in update_data.items():
+            if field in columns:
+                setattr(db_obj, field, value)
+        # Only the changed columns are written, and the session does not
+        # expire on commit, so the object is current without a refresh
+        await db.commit()
         return db_obj
     
-    def remove(self, db: Session, *, id: Any) -> ModelType:
+    async def remove(self, db: AsyncSession, *, id: Any) -> ModelType:
         """
         Delete a record
         """
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
-        db.commit()
-        return obj
\ No newline at end of file
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        return obj
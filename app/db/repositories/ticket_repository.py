@@ -1,23 +1,353 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import and_, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from uuid import UUID
+from app.core.pagination import CursorPosition
+from app.db.message_writer import message_writer
 from app.db.repositories.base import BaseRepository
 from app.db.models import Ticket, Message
+from app.db.notifications import message_broker, message_event
 from app.schemas.ticket import TicketCreate, TicketUpdate
 from app.schemas.message import MessageCreate
 
+class MessageWindow(NamedTuple):
+    ticket: Optional[Ticket]
+    messages: List[Message]
+    latest_message_id: Optional[UUID]
+    # False when `after_id` is not a message on the ticket
+    anchor_found: bool = True
+
 class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
-    def get_by_user_id(self, db: Session, *, user_id: UUID) -> List[Ticket]:
-        return db.query(Ticket).filter(Ticket.user_id == user_id).all()
+    async def get_with_message_window(
+        self,
+        db: AsyncSession,
+        *,
+        ticket_id: UUID,
+        limit: int,
+        owner_id: Optional[UUID] = None,
+        before: Optional[CursorPosition] = None,
+        after_id: Optional[UUID] = None
+    ) -> MessageWindow:
+        """
+        Load a ticket, a window of its messages and the id of its newest
+        message in a single statement.
+        
+        By default the window is the newest `limit` messages; `before` pages
+        back from a keyset position and `after_id` returns the messages that
+        follow a known message of the ticket, for incremental sync. Up to
+        `limit + 1` messages are returned, oldest first, so callers can tell
+        whether the window was cut short.
+        
+        With `owner_id` set, tickets owned by anyone else are filtered out in
+        the WHERE clause, so unauthorized access costs no extra round-trip.
+        """
+        position = tuple_(Message.created_at, Message.id)
+        window = select(Message).where(Message.ticket_id == ticket_id)
+        anchor = None
+        if after_id is not None:
+            anchor = (
+                select(Message.created_at)
+                .where(Message.id == after_id, Message.ticket_id == ticket_id)
+                .scalar_subquery()
+            )
+            window = window.where(
+                or_(
+                    Message.created_at > anchor,
+                    and_(Message.created_at == anchor, Message.id > after_id)
+                )
+            ).order_by(Message.created_at, Message.id)
+        else:
+            if before is not None:
+                window = window.where(position < tuple_(*before))
+            window = window.order_by(Message.created_at.desc(), Message.id.desc())
+        window_message = aliased(Message, window.limit(limit + 1).subquery())
+        
+        # An unknown anchor would silently select nothing, so report it
+        anchor_column = anchor if anchor is not None else literal(None)
+        query = (
+            select(Ticket, self._latest_message_id(), anchor_column, window_message)
+            .outerjoin(window_message, window_message.ticket_id == Ticket.id)
+            .where(Ticket.id == ticket_id)
+        )
+        if owner_id is not None:
+            query = query.where(Ticket.user_id == owner_id)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return MessageWindow(None, [], None)
+        
+        ticket, latest_message_id, anchor_created_at, _ = rows[0]
+        messages = sorted(
+            (message for *_, message in rows if message is not None),
+            key=lambda message: (message.created_at, message.id)
+        )
+        return MessageWindow(
+            ticket, messages, latest_message_id, anchor_found=after_id is None or anchor_created_at is not None
+        )
+    
+    async def get_by_user_id(self, db: AsyncSession, *, user_id: UUID) -> List[Ticket]:
+        result = await db.execute(select(Ticket).where(Ticket.user_id == user_id))
+        return result.scalars().all()
+    
+    async def get_page_by_user_id(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: UUID,
+        limit: int,
+        after: Optional[CursorPosition] = None,
+        status: Optional[str] = None
+    ) -> List[Ticket]:
+        """Newest-first page of a user's tickets, starting after a keyset position"""
+        query = select(Ticket).where(Ticket.user_id == user_id)
+        if status is not None:
+            query = query.where(Ticket.status == status)
+        if after is not None:
+            query = query.where(tuple_(Ticket.created_at, Ticket.id) < tuple_(*after))
+        query = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(limit)
+        result = await db.execute(query)
+        return result.scalars().all()
+    
+    @staticmethod
+    def _latest_message_id():
+        return (
+            select(Message.id)
+            .where(Message.ticket_id == Ticket.id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(1)
+            .correlate(Ticket)
+            .scalar_subquery()
+        )
+    
+    async def get_version(
+        self, db: AsyncSession, *, ticket_id: UUID, owner_id: Optional[UUID] = None
+    ) -> Optional[Tuple[datetime, Optional[UUID]]]:
+        """
+        The ticket's updated_at and newest message id, read from the primary
+        key and the (ticket_id, created_at) index without loading messages
+        """
+        query = select(Ticket.updated_at, self._latest_message_id()).where(Ticket.id == ticket_id)
+        if owner_id is not None:
+            query = query.where(Ticket.user_id == owner_id)
+        row = (await db.execute(query)).first()
+        return tuple(row) if row is not None else None
+    
+    async def get_list_version(
+        self, db: AsyncSession, *, user_id: UUID, status: Optional[str] = None
+    ) -> Tuple[Optional[datetime], int]:
+        """Latest updated_at and row count over a user's tickets"""
+        query = select(func.max(Ticket.updated_at), func.count()).where(Ticket.user_id == user_id)
+        if status is not None:
+            query = query.where(Ticket.status == status)
+        row = (await db.execute(query)).one()
+        return row[0], row[1]
     
-    def add_message(self, db: Session, *, ticket_id: UUID, message: MessageCreate) -> Message:
-        db_message = Message(**message.dict(), ticket_id=ticket_id)
+    async def add_message(
+        self,
+        db: AsyncSession,
+        *,
+        ticket_id: UUID,
+        message: MessageCreate,
+        durable: bool = True,
+        generated: bool = False
+    ) -> Message:
+        """
+        Insert a message and publish it to subscribers of the ticket.
+        
+        `generated` marks a reply the server produced itself. With the
+        write-behind writer running the message is batched with others
+        instead; `durable=False` then returns before it is committed.
+        """
+        if message_writer.running:
+            # End the read transaction first so the connection goes back to
+            # the pool; requests waiting on a batch must not starve the writer
+            await db.commit()
+            return await message_writer.submit(
+                ticket_id, message, durable=durable, generated=generated
+            )
+        
+        db_message = Message(**message.dict(), ticket_id=ticket_id, generated=generated)
         db.add(db_message)
-        db.commit()
-        db.refresh(db_message)
+        # Bump the ticket so its version, and cached representations, move on
+        await db.execute(
+            update(Ticket).where(Ticket.id == ticket_id).values(updated_at=datetime.utcnow())
+        )
+        await db.flush()
+        event = message_event(db_message)
+        await message_broker.before_commit(db, [event])
+        # Defaults were set on flush and the session does not expire on
+        # commit, so no refresh is needed
+        await db.commit()
+        message_broker.after_commit([event])
         return db_message
     
-    def get_messages(self, db: Session, *, ticket_id: UUID) -> List[Message]:
-        return db.query(Message).filter(Message.ticket_id == ticket_id).order_by(Message.created_at).all()
+    async def get_messages(
+        self, db: AsyncSession, *, ticket_id: UUID, after: Optional[datetime] = None
+    ) -> List[Message]:
+        query = select(Message).where(Message.ticket_id == ticket_id)
+        if after is not None:
+            query = query.where(Message.created_at > after)
+        result = await db.execute(query.order_by(Message.created_at))
+        return result.scalars().all()
+    
+    async def update_summary(
+        self,
+        db: AsyncSession,
+        *,
+        ticket_id: UUID,
+        summary: Optional[str],
+        summarized_until: Optional[datetime],
+        previous_until: Optional[datetime]
+    ) -> bool:
+        """
+        Save a rolling summary extended from the one that covered messages up
+        to `previous_until`. Compare-and-set: if another request moved the
+        summary on in the meantime, nothing is written and False is returned.
+        """
+        # Bookkeeping only, so leave updated_at untouched
+        result = await db.execute(
+            update(Ticket)
+            .where(
+                Ticket.id == ticket_id,
+                Ticket.summarized_until.is_not_distinct_from(previous_until)
+            )
+            .values(summary=summary, summarized_until=summarized_until, updated_at=Ticket.updated_at)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def get_resolved_answers(
+        self,
+        db: AsyncSession,
+        *,
+        statuses: Sequence[str],
+        ticket_id: Optional[UUID] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[UUID, str, str]]:
+        """
+        (ticket id, description, final AI reply) for up to `limit` tickets
+        staff resolved into one of `statuses`, most recently updated first.
+        Only replies the server generated count; tickets that never got one
+        are left out.
+        """
+        latest = (
+            select(Message.ticket_id, func.max(Message.created_at).label("created_at"))
+            .where(Message.generated.is_(True))
+            .group_by(Message.ticket_id)
+            .subquery()
+        )
+        query = (
+            select(Ticket.id, Ticket.description, Message.content)
+            .join(latest, latest.c.ticket_id == Ticket.id)
+            .join(
+                Message,
+                and_(
+                    Message.ticket_id == latest.c.ticket_id,
+                    Message.created_at == latest.c.created_at,
+                    Message.generated.is_(True)
+                )
+            )
+            .where(Ticket.status.in_(statuses), Ticket.resolved_by_staff.is_(True))
+            .order_by(Ticket.updated_at.desc(), Ticket.id.desc())
+        )
+        if ticket_id is not None:
+            query = query.where(Ticket.id == ticket_id)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await db.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def bulk_update_status(
+        self,
+        db: AsyncSession,
+        *,
+        from_status: str,
+        to_status: str,
+        resolved_by_staff: bool = False,
+        updated_before: Optional[datetime] = None
+    ) -> List[UUID]:
+        """Move every matching ticket to `to_status` in one UPDATE, returning their ids"""
+        query = update(Ticket).where(Ticket.status == from_status)
+        if updated_before is not None:
+            query = query.where(Ticket.updated_at < updated_before)
+        result = await db.execute(
+            query.values(status=to_status, resolved_by_staff=resolved_by_staff)
+            .returning(Ticket.id)
+            .execution_options(synchronize_session=False)
+        )
+        ids = result.scalars().all()
+        await db.commit()
+        return ids
+    
+    async def stream_with_messages(
+        self, db: AsyncSession, *, batch_size: int
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield every ticket with its messages as plain dicts, one ticket at a time.
+        
+        Rows are read through a server-side cursor `batch_size` at a time and
+        never enter the session's identity map, so memory stays flat however
+        many tickets there are.
+        """
+        query = (
+            select(
+                Ticket.id, Ticket.user_id, Ticket.title, Ticket.description, Ticket.status,
+                Ticket.created_at, Ticket.updated_at, Ticket.summary, Ticket.summarized_until,
+                Ticket.resolved_by_staff,
+                Message.id.label("message_id"),
+                Message.content,
+                Message.is_ai,
+                Message.generated,
+                Message.created_at.label("message_created_at")
+            )
+            .outerjoin(Message, Message.ticket_id == Ticket.id)
+            .order_by(Ticket.id, Message.created_at, Message.id)
+            .execution_options(yield_per=batch_size)
+        )
+        
+        current: Optional[Dict[str, Any]] = None
+        result = await db.stream(query)
+        async for row in result:
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    yield current
+                current = {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "title": row.title,
+                    "description": row.description,
+                    "status": row.status,
+                    "created_at": row.created_at,
+                    "updated_at": row.updated_at,
+                    "summary": row.summary,
+                    "summarized_until": row.summarized_until,
+                    "resolved_by_staff": row.resolved_by_staff,
+                    "messages": [],
+                }
+            if row.message_id is not None:
+                current["messages"].append({
+                    "id": row.message_id,
+                    "content": row.content,
+                    "is_ai": row.is_ai,
+                    "generated": row.generated,
+                    "created_at": row.message_created_at,
+                })
+        if current is not None:
+            yield current
+    
+    async def bulk_insert(
+        self,
+        db: AsyncSession,
+        *,
+        tickets: List[Dict[str, Any]],
+        messages: List[Dict[str, Any]]
+    ) -> None:
+        """Insert tickets and messages as multi-row INSERTs in one transaction"""
+        if tickets:
+            await db.execute(insert(Ticket), tickets)
+        if messages:
+            await db.execute(insert(Message), messages)
+        await db.commit()
 
-ticket_repository = TicketRepository(Ticket)
\ No newline at end of file
+ticket_repository = TicketRepository(Ticket)
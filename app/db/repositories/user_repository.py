@@ -1,11 +1,31 @@
-from typing import Optional
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import principal_cache
 from app.db.repositories.base import BaseRepository
 from app.db.models import User
 from app.schemas.auth import UserCreate, UserUpdate
 
 class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
-    def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+    
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        user = await super().update(db, db_obj=db_obj, obj_in=obj_in)
+        # Role or is_active may have changed, drop the cached principal
+        principal_cache.invalidate(user.id)
+        return user
+    
+    async def remove(self, db: AsyncSession, *, id: Any) -> User:
+        user = await super().remove(db, id=id)
+        principal_cache.invalidate(user.id)
+        return user
 
-user_repository = UserRepository(User)
\ No newline at end of file
+user_repository = UserRepository(User)
@@ -0,0 +1,20 @@
+import uuid
+from typing import Any, Optional
+
+from sqlalchemy import Uuid
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator
+
+class GUID(TypeDecorator):
+    """
+    UUID column that works on every dialect: native UUID on PostgreSQL,
+    CHAR(32) elsewhere. Accepts UUIDs or their string form and always
+    returns uuid.UUID.
+    """
+    impl = Uuid(as_uuid=True)
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Dialect) -> Optional[uuid.UUID]:
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(str(value))
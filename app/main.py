@@ -1,36 +1,126 @@
-import uvicorn
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+import math
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import auth, tickets
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.endpoints import admin, auth, tickets
+from app.core.concurrency import OverloadedError
 from app.core.config import settings
-from app.db.base import Base
-from app.db.base import engine
+from app.core.instrumentation import MetricsMiddleware, event_loop_monitor, instrument_engine
+from app.core.metrics import metrics
+from app.core.readiness import readiness
+from app.core.security import password_hasher
+from app.db.base import SessionLocal, create_schema, engine, warm_pool
+from app.db.message_writer import message_writer
+from app.db.notifications import message_broker
+from app.services.ai_service import ai_service
+from app.services.draft_queue import draft_queue
+from app.services.similarity_index import similarity_index
+from app.services.ticket_service import ticket_service
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+async def initialize_database() -> None:
+    """Startup steps that need the database; each is safe to repeat"""
+    # Independent round trips, so overlap them
+    await asyncio.gather(
+        warm_pool(settings.DB_POOL_WARM_SIZE),
+        create_schema() if settings.DB_CREATE_SCHEMA else asyncio.sleep(0),
+        message_broker.start(),
+    )
+    if settings.SIMILARITY_INDEX_ENABLED:
+        async with SessionLocal() as db:
+            await similarity_index.load(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The database steps retry in the background, so a worker still boots
+    # during an outage; /health/ready turns 200 once they succeed
+    readiness.start(initialize_database)
+    
+    # One pooled HTTP client to the LLM provider for the app's lifetime
+    await ai_service.start()
+    if settings.MESSAGE_WRITE_BEHIND_ENABLED:
+        await message_writer.start()
+    await draft_queue.start(ticket_service.generate_draft)
+    if settings.METRICS_ENABLED:
+        await event_loop_monitor.start()
+    if settings.SIMILARITY_INDEX_ENABLED:
+        await similarity_index.start(settings.SIMILARITY_INDEX_RELOAD_SECONDS)
+    await readiness.wait(settings.STARTUP_WAIT_SECONDS)
+    try:
+        yield
+    finally:
+        await readiness.stop()
+        await event_loop_monitor.stop()
+        await similarity_index.stop()
+        await draft_queue.stop()
+        await message_writer.stop()
+        await message_broker.stop()
+        await ai_service.close()
+        await engine.dispose()
+        password_hasher.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Customer Support Assistant API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Set up CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
+    # Origins as browsers send them, without the slash URL parsing adds
+    allow_origins=[str(origin).rstrip("/") for origin in settings.CORS_ORIGINS],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide response headers from scripts unless they are listed
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    # Shed load quickly and tell the client when to come back
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(tickets.router, prefix="/tickets", tags=["Tickets"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/", tags=["Health"])
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/live", tags=["Health"])
+async def liveness_check():
+    """The process is up and its event loop is responsive"""
+    return {"status": "alive"}
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Startup has finished and the database answers; 503 otherwise"""
+    problem = await readiness.check(engine)
+    if problem:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": problem})
+    return {"status": "ready"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        # Rendered on scrape only; recording a sample is a dict update
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -20,4 +20,9 @@ class MessageInDB(MessageBase):
         from_attributes = True
         
 class Message(MessageInDB):
-    pass
\ No newline at end of file
+    pass
+
+class MessageImport(MessageCreate):
+    id: Optional[UUID] = None
+    generated: bool = False
+    created_at: Optional[datetime] = None
\ No newline at end of file
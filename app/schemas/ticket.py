@@ -1,8 +1,8 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 from datetime import datetime
-from pydantic import BaseModel, Field
-from app.schemas.message import Message
+from pydantic import BaseModel, Field, field_validator
+from app.schemas.message import Message, MessageImport
 
 class TicketBase(BaseModel):
     title: Optional[str] = None
@@ -13,8 +13,20 @@ class TicketCreate(TicketBase):
     title: str = Field(..., min_length=3, max_length=100)
     description: str = Field(..., min_length=10)
     
+TicketStatus = Literal["open", "in_progress", "resolved", "closed"]
+
 class TicketUpdate(TicketBase):
-    pass
+    title: Optional[str] = Field(None, min_length=3, max_length=100)
+    description: Optional[str] = Field(None, min_length=10)
+    status: Optional[TicketStatus] = None
+    
+    @field_validator("title", "description", "status")
+    @classmethod
+    def not_null(cls, value):
+        # Fields may be left out of a PATCH, but none of them can be cleared
+        if value is None:
+            raise ValueError("may not be null")
+        return value
 
 class TicketInDB(TicketBase):
     id: UUID
@@ -29,4 +41,34 @@ class Ticket(TicketInDB):
     pass
 
 class TicketWithMessages(Ticket):
-    messages: List[Message] = []
\ No newline at end of file
+    messages: List[Message] = []
+    # Pass back as `before` to load the next older page of messages
+    messages_cursor: Optional[str] = None
+
+class TicketImport(BaseModel):
+    """One line of a bulk import, in the format produced by the export"""
+    id: Optional[UUID] = None
+    user_id: UUID
+    title: str
+    description: str
+    status: TicketStatus = "open"
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    summary: Optional[str] = None
+    summarized_until: Optional[datetime] = None
+    resolved_by_staff: bool = False
+    messages: List[MessageImport] = []
+
+class BulkStatusUpdate(BaseModel):
+    from_status: TicketStatus
+    to_status: TicketStatus
+    # Only tickets with no activity for this many days
+    older_than_days: Optional[int] = Field(None, ge=0)
+
+class BulkStatusResult(BaseModel):
+    updated: int
+
+class ImportResult(BaseModel):
+    tickets: int
+    messages: int
+    batches: int
\ No newline at end of file
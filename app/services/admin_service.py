@@ -0,0 +1,216 @@
+import json
+import logging
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.db.repositories.ticket_repository import ticket_repository
+from app.schemas.ticket import BulkStatusResult, BulkStatusUpdate, ImportResult, TicketImport
+from app.services.similarity_index import RESOLVED_STATUSES, similarity_index
+
+logger = logging.getLogger(__name__)
+
+# Export output is flushed to the client in chunks of about this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class AdminService:
+    @staticmethod
+    async def export_tickets(gzipped: bool = False) -> AsyncGenerator[bytes, None]:
+        """
+        Stream every ticket with its messages as NDJSON, one ticket per line,
+        optionally gzip compressed
+        """
+        compressor = zlib.compressobj(wbits=31) if gzipped else None
+        started_at = time.perf_counter()
+        tickets = messages = 0
+        buffer: List[bytes] = []
+        buffered = 0
+
+        # The export outlives the request handler, so it uses its own session
+        async with SessionLocal() as db:
+            async for ticket in ticket_repository.stream_with_messages(
+                db, batch_size=settings.EXPORT_BATCH_SIZE
+            ):
+                line = json.dumps(ticket, default=_json_default).encode("utf-8") + b"\n"
+                buffer.append(line)
+                buffered += len(line)
+                tickets += 1
+                messages += len(ticket["messages"])
+                if buffered >= EXPORT_CHUNK_BYTES:
+                    chunk = b"".join(buffer)
+                    buffer, buffered = [], 0
+                    yield compressor.compress(chunk) if compressor else chunk
+
+        chunk = b"".join(buffer)
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+        logger.info(
+            "Exported %d tickets and %d messages in %.1f s",
+            tickets, messages, time.perf_counter() - started_at
+        )
+
+    @staticmethod
+    async def _read_lines(body: AsyncIterator[bytes], gzipped: bool) -> AsyncGenerator[bytes, None]:
+        """Split a streamed, optionally gzip compressed upload into lines"""
+        decompressor = zlib.decompressobj(wbits=47) if gzipped else None
+        pending = b""
+        async for chunk in body:
+            if decompressor:
+                data = decompressor.decompress(chunk)
+                # A gzip file may hold several members back to back
+                while decompressor.eof and decompressor.unused_data:
+                    rest = decompressor.unused_data
+                    decompressor = zlib.decompressobj(wbits=47)
+                    data += decompressor.decompress(rest)
+                chunk = data
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                yield line
+        if decompressor:
+            pending += decompressor.flush()
+        for line in pending.split(b"\n"):
+            yield line
+
+    @staticmethod
+    async def import_tickets(body: AsyncIterator[bytes], gzipped: bool = False) -> ImportResult:
+        """
+        Bulk insert NDJSON tickets with their messages, in batched transactions.
+
+        Batches committed before an invalid line or a conflicting id stay
+        imported; the error reports how far the import got.
+        """
+        started_at = time.perf_counter()
+        result = ImportResult(tickets=0, messages=0, batches=0)
+        tickets: List[Dict[str, Any]] = []
+        messages: List[Dict[str, Any]] = []
+
+        async with SessionLocal() as db:
+            async def flush() -> None:
+                nonlocal tickets, messages
+                try:
+                    await ticket_repository.bulk_insert(db, tickets=tickets, messages=messages)
+                except IntegrityError:
+                    await db.rollback()
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"Batch {result.batches + 1} conflicts with existing rows; "
+                               f"{result.tickets} tickets were imported before it"
+                    )
+                result.tickets += len(tickets)
+                result.messages += len(messages)
+                result.batches += 1
+                tickets, messages = [], []
+
+            last_created_at = datetime.min
+
+            def next_created_at() -> datetime:
+                # Strictly increasing, so rows without timestamps keep their file order
+                nonlocal last_created_at
+                last_created_at = max(datetime.utcnow(), last_created_at + timedelta(microseconds=1))
+                return last_created_at
+
+            line_number = 0
+            async for line in AdminService._read_lines(body, gzipped):
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    item = TicketImport.model_validate_json(line)
+                except ValidationError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Line {line_number}: {e.errors()[0]['msg']}; "
+                               f"{result.tickets} tickets were imported before it"
+                    )
+
+                now = next_created_at()
+                ticket_id = item.id or uuid.uuid4()
+                tickets.append({
+                    "id": ticket_id,
+                    "user_id": item.user_id,
+                    "title": item.title,
+                    "description": item.description,
+                    "status": item.status,
+                    "created_at": item.created_at or now,
+                    "updated_at": item.updated_at or item.created_at or now,
+                    "summary": item.summary,
+                    "summarized_until": item.summarized_until,
+                    "resolved_by_staff": item.resolved_by_staff,
+                })
+                messages.extend(
+                    {
+                        "id": message.id or uuid.uuid4(),
+                        "ticket_id": ticket_id,
+                        "content": message.content,
+                        "is_ai": message.is_ai,
+                        "generated": message.generated,
+                        "created_at": message.created_at or next_created_at(),
+                    }
+                    for message in item.messages
+                )
+                if len(tickets) + len(messages) >= settings.IMPORT_BATCH_SIZE:
+                    await flush()
+
+            if tickets:
+                await flush()
+
+            # Imported tickets may already be resolved; rebuilding the index
+            # can take a while, so it happens after the response
+            if settings.SIMILARITY_INDEX_ENABLED and result.tickets:
+                similarity_index.schedule_load()
+
+        logger.info(
+            "Imported %d tickets and %d messages in %d batches in %.1f s",
+            result.tickets, result.messages, result.batches, time.perf_counter() - started_at
+        )
+        return result
+
+    @staticmethod
+    async def bulk_update_status(db: AsyncSession, bulk_update: BulkStatusUpdate) -> BulkStatusResult:
+        """Move every ticket in one status to another with a single set-based UPDATE"""
+        updated_before = None
+        if bulk_update.older_than_days is not None:
+            updated_before = datetime.utcnow() - timedelta(days=bulk_update.older_than_days)
+        
+        started_at = time.perf_counter()
+        ids = await ticket_repository.bulk_update_status(
+            db,
+            from_status=bulk_update.from_status,
+            to_status=bulk_update.to_status,
+            # Only admins reach this, so a bulk resolution is a staff one
+            resolved_by_staff=bulk_update.to_status in RESOLVED_STATUSES,
+            updated_before=updated_before
+        )
+        logger.info(
+            "Moved %d tickets from %s to %s in %.1f ms",
+            len(ids), bulk_update.from_status, bulk_update.to_status,
+            (time.perf_counter() - started_at) * 1000
+        )
+        
+        # Only a move into or out of the resolved states changes the index
+        entering = bulk_update.to_status in RESOLVED_STATUSES
+        leaving = bulk_update.from_status in RESOLVED_STATUSES
+        if settings.SIMILARITY_INDEX_ENABLED and ids and entering != leaving:
+            similarity_index.schedule_load()
+        return BulkStatusResult(updated=len(ids))
+
+admin_service = AdminService()
@@ -0,0 +1,88 @@
+import hashlib
+from typing import Callable, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.response_stream import ResponseStream
+
+class AIResponseCache:
+    """
+    Shares AI generations between identical requests.
+
+    Streams are keyed on a hash of the model and built prompt. A request
+    that finds a stream still generating joins it (single flight); one that
+    finds a finished stream replays it. Either way no new upstream call is
+    made. Entries are dropped when a new message lands on their ticket.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self._streams: TTLCache[str, Tuple[UUID, ResponseStream]] = TTLCache(
+            "ai_response", max_size=max_size, ttl=ttl, on_evict=self._forget
+        )
+        # Keys of each ticket's cached streams, pruned as the cache evicts
+        # them so it never outgrows the cache
+        self._ticket_keys: Dict[UUID, Set[str]] = {}
+
+        self._coalesced = metrics.counter(
+            "ai_response_coalesced_total", "AI requests that joined an in-flight generation"
+        )
+        self._saved = metrics.counter(
+            "ai_upstream_calls_saved_total", "AI requests served without a new upstream call"
+        )
+        self._upstream = metrics.counter(
+            "ai_upstream_calls_total", "AI generations started against the upstream provider"
+        )
+
+    @staticmethod
+    def key_for(ticket_id: UUID, model: str, prompt: str) -> str:
+        # Scoped to the ticket: each ticket saves its own reply, even when two
+        # tickets happen to build the same prompt
+        return hashlib.sha256(f"{ticket_id}\0{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get_or_start(
+        self,
+        ticket_id: UUID,
+        key: str,
+        start: Callable[[], ResponseStream],
+        ttl: Optional[float] = None,
+        upstream: bool = True
+    ) -> ResponseStream:
+        """
+        Return the shared stream for `key`, calling `start` only if there is
+        none; `upstream` says whether `start` calls the LLM provider
+        """
+        entry = self._streams.get(key)
+        if entry is not None and entry[1].error is None:
+            stream = entry[1]
+            if not stream.done:
+                self._coalesced.inc()
+            self._saved.inc()
+            return stream
+
+        stream = start()
+        if upstream:
+            self._upstream.inc()
+        self._streams.set(key, (ticket_id, stream), ttl=ttl)
+        self._ticket_keys.setdefault(ticket_id, set()).add(key)
+        return stream
+
+    def _forget(self, key: str, entry: Tuple[UUID, ResponseStream]) -> None:
+        ticket_id = entry[0]
+        keys = self._ticket_keys.get(ticket_id)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._ticket_keys[ticket_id]
+
+    def invalidate_ticket(self, ticket_id: UUID) -> None:
+        """Drop every cached reply for a ticket whose conversation has moved on"""
+        for key in self._ticket_keys.pop(ticket_id, ()):
+            self._streams.invalidate(key)
+
+# Initialize the cache
+ai_response_cache = AIResponseCache(
+    max_size=settings.AI_RESPONSE_CACHE_MAX_SIZE,
+    ttl=settings.AI_RESPONSE_CACHE_TTL_SECONDS,
+)
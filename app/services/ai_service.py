@@ -1,104 +1,317 @@
-import os
-import json
 import asyncio
+import time
 import aiohttp
-from typing import AsyncGenerator, Dict, List
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 from fastapi import HTTPException, status
+from app.core.concurrency import ConcurrencyLimiter, OverloadedError
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.db.models import Message, Ticket
+from app.services.llm_providers import LLMProvider, ProviderError, configured_providers
+from app.services.prompt_builder import count_tokens, prompt_builder
+
+# A provider's opened stream: the provider, its first chunk (None if the
+# reply was empty) and the rest of the stream
+OpenedStream = Tuple[LLMProvider, Optional[str], AsyncGenerator[str, None]]
 
 class AIService:
-    def __init__(self):
-        self.api_key = settings.GROQ_API_KEY
-        self.model = settings.GROQ_MODEL
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+    def __init__(self, providers: Optional[List[LLMProvider]] = None):
+        self.providers = providers if providers is not None else configured_providers()
+        self.model = self.providers[0].model
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Bounds upstream calls so a spike queues briefly or is shed, instead
+        # of overrunning the provider's rate limits
+        self.limiter = ConcurrencyLimiter(
+            "llm",
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_queue=settings.LLM_MAX_QUEUE,
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS
+        )
+        
+        self._requests = metrics.counter(
+            "llm_provider_requests_total", "Upstream LLM requests by provider and outcome",
+            labelnames=("provider", "outcome")
+        )
+        self._ttft = metrics.histogram(
+            "llm_provider_first_token_seconds", "Time to first token by provider",
+            labelnames=("provider",), buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+        )
+        self._hedged = metrics.counter(
+            "llm_hedged_requests_total", "Streams that fired a backup request to another provider"
+        )
+        self._hedge_wins = metrics.counter(
+            "llm_hedge_wins_total", "Hedged streams won by the backup request"
+        )
+        self._prompt_tokens = metrics.histogram(
+            "ai_prompt_tokens", "Tokens in prompts sent to the LLM",
+            buckets=(250, 500, 1000, 2000, 4000, 8000, 16000)
+        )
+        self._first_token = metrics.histogram(
+            "llm_first_token_seconds",
+            "Time from asking for a stream to its first token, including queueing and hedging",
+            buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+        )
+        self._tokens_per_second = metrics.histogram(
+            "llm_output_tokens_per_second", "Streaming speed after the first token",
+            buckets=(5, 10, 25, 50, 100, 200, 400, 800)
+        )
+        self._errors = metrics.counter(
+            "llm_errors_total", "LLM calls that failed after every provider was tried",
+            labelnames=("kind",)
+        )
+    
+    async def start(self) -> None:
+        """Open the pooled HTTP client shared by all requests to the provider"""
+        if self.session is not None and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=settings.LLM_POOL_SIZE,
+            limit_per_host=settings.LLM_POOL_SIZE_PER_HOST,
+            keepalive_timeout=settings.LLM_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=settings.LLM_TOTAL_TIMEOUT_SECONDS,
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            sock_read=settings.LLM_READ_TIMEOUT_SECONDS
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP client and its open connections"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Opened lazily when used outside the application lifespan
+        if self.session is None or self.session.closed:
+            await self.start()
+        return self.session
     
     def _build_prompt(self, ticket: Ticket, messages: List[Message]) -> str:
         """Build a prompt for the AI model based on ticket and message history"""
-        # Get the message history
-        message_history = "\n".join([
-            f"{'Support Assistant' if msg.is_ai else 'Customer'}: {msg.content}"
-            for msg in messages
-        ])
-        
-        # Get the latest message (if any)
-        latest_message = ""
-        if messages and not messages[-1].is_ai:
-            latest_message = messages[-1].content
-        
-        # Build the prompt
-        prompt = f"""
-        You are a helpful customer support assistant. 
-        The customer has the following issue: {ticket.description}
-
-        Previous messages:
-        {message_history}
-
-        {"Customer's latest message: " + latest_message if latest_message else ""}
-
-        Provide a helpful response that addresses their concern:
-        """
-        
-        return prompt
+        return prompt_builder.build(ticket, messages).prompt
     
     async def generate_response(self, ticket: Ticket, messages: List[Message]) -> str:
         """Generate an AI response for a ticket using direct HTTP request"""
-        prompt = self._build_prompt(ticket, messages)
-        
-        payload = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}]
-        }
+        return await self.complete_prompt(self._build_prompt(ticket, messages))
+    
+    def _available_providers(self) -> List[LLMProvider]:
+        """
+        Providers whose circuit breaker would let a call through, in routing
+        order. Breakers are only claimed with `allow()` when a call is made.
+        """
+        providers = [provider for provider in self.providers if provider.breaker.available]
+        if not providers:
+            raise OverloadedError(
+                "AI providers are unavailable",
+                retry_after=min(provider.breaker.retry_after for provider in self.providers)
+            )
+        return providers
+    
+    def _record_failure(self, provider: LLMProvider, error: BaseException) -> None:
+        provider.breaker.record_failure()
+        outcome = "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+        self._requests.inc(provider=provider.name, outcome=outcome)
+    
+    def _hedge_delay(self, provider: LLMProvider) -> Optional[float]:
+        """How long to wait for the first token before firing a backup request"""
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        threshold = provider.ttft_percentile(settings.LLM_HEDGE_PERCENTILE)
+        if threshold is None:
+            return settings.LLM_HEDGE_INITIAL_DELAY_SECONDS
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, threshold)
+    
+    async def complete_prompt(self, prompt: str) -> str:
+        """Generate a completion for an already built prompt, failing over between providers"""
+        self._prompt_tokens.observe(count_tokens(prompt))
+        async with self.limiter.slot():
+            session = await self._get_session()
+            last_error: Optional[BaseException] = None
+            for provider in self._available_providers():
+                if not provider.breaker.allow():
+                    continue
+                try:
+                    content = await provider.complete(session, prompt)
+                except ProviderError as e:
+                    self._record_failure(provider, e)
+                    last_error = e
+                    continue
+                provider.breaker.record_success()
+                self._requests.inc(provider=provider.name, outcome="success")
+                return content
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url, 
-                    headers=self.headers, 
-                    json=payload
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                            detail=f"Groq API error: {error_text}"
-                        )
-                    
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
-        except aiohttp.ClientError as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error communicating with Groq API: {str(e)}"
+        if last_error is None:
+            # Every breaker was claimed by concurrent calls in the meantime
+            raise OverloadedError(
+                "AI providers are unavailable",
+                retry_after=min(provider.breaker.retry_after for provider in self.providers)
             )
+        self._errors.inc(kind="complete")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error communicating with AI provider: {str(last_error)}"
+        )
     
     async def stream_response(self, ticket: Ticket, messages: List[Message]) -> AsyncGenerator[str, None]:
+        """Stream an AI response for a ticket"""
+        async for chunk in self.stream_prompt(self._build_prompt(ticket, messages)):
+            yield chunk
+
+    async def stream_prompt(self, prompt: str) -> AsyncGenerator[str, None]:
         """
-        Stream an AI response for a ticket
-        
-        Note: This is a simplified version that doesn't use actual streaming.
-        It generates the full response first, then simulates streaming by yielding chunks.
+        Stream a completion for an already built prompt
+
+        The first provider whose stream produces a token is used; see
+        `_open_stream` for how requests are hedged and failed over.
         """
-        try:
-            # Get the full response
-            full_response = await self.generate_response(ticket, messages)
+        self._prompt_tokens.observe(count_tokens(prompt))
+        started_at = time.perf_counter()
+        async with self.limiter.slot():
+            try:
+                provider, first, chunks = await self._open_stream(prompt)
+            except HTTPException:
+                self._errors.inc(kind="stream_open")
+                raise
+            first_token_at = time.perf_counter()
+            self._first_token.observe(first_token_at - started_at)
             
-            # Simulate streaming by yielding chunks of the response
-            chunk_size = 10  # characters per chunk
-            for i in range(0, len(full_response), chunk_size):
-                chunk = full_response[i:i+chunk_size]
-                yield chunk
-                await asyncio.sleep(0.05)  # Simulate delay between chunks
+            output_tokens = 0
+            try:
+                if first is not None:
+                    output_tokens += count_tokens(first)
+                    yield first
+                async for chunk in chunks:
+                    output_tokens += count_tokens(chunk)
+                    yield chunk
                 
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error streaming AI response: {str(e)}"
+                elapsed = time.perf_counter() - first_token_at
+                if elapsed > 0 and output_tokens > 1:
+                    self._tokens_per_second.observe(output_tokens / elapsed)
+            except ProviderError as e:
+                self._record_failure(provider, e)
+                self._errors.inc(kind="stream")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error streaming AI response: {str(e)}"
+                )
+            finally:
+                await chunks.aclose()
+
+    async def _first_chunk(self, provider: LLMProvider, prompt: str) -> OpenedStream:
+        """Open a stream on one provider and wait for its first token"""
+        session = await self._get_session()
+        chunks = provider.stream(session, prompt)
+        started_at = time.perf_counter()
+        try:
+            first = await asyncio.wait_for(chunks.__anext__(), timeout=provider.first_token_timeout)
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            await chunks.aclose()
+            raise
+        
+        # Only successful opens are sampled: a failure or timeout says nothing
+        # about how fast tokens arrive, and counting timeouts would push the
+        # hedging threshold up to the timeout just when the provider is slow
+        elapsed = time.perf_counter() - started_at
+        provider.observe_ttft(elapsed)
+        self._ttft.observe(elapsed, provider=provider.name)
+        return provider, first, chunks
+
+    async def _open_stream(self, prompt: str) -> OpenedStream:
+        """
+        Open a stream on the first provider to produce a token.
+
+        Starts with the primary provider. If it has not produced a token
+        within its recent p95 time to first token, a backup request is fired
+        at the next provider and whichever responds first wins; the others
+        are cancelled. A provider that fails is replaced by the next one
+        straight away.
+        """
+        providers = self._available_providers()
+        primary = providers[0]
+        attempts: Dict[asyncio.Task, LLMProvider] = {}
+        
+        def launch() -> None:
+            # Claim a breaker only for the provider actually called
+            while providers:
+                provider = providers.pop(0)
+                if provider.breaker.allow():
+                    attempts[asyncio.create_task(self._first_chunk(provider, prompt))] = provider
+                    return
+        
+        launch()
+        if not attempts:
+            raise OverloadedError(
+                "AI providers are unavailable",
+                retry_after=min(provider.breaker.retry_after for provider in self.providers)
             )
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(
+                    attempts,
+                    timeout=self._hedge_delay(primary) if providers else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self._hedged.inc()
+                    launch()
+                    continue
+                
+                for task in done:
+                    provider = attempts.pop(task)
+                    try:
+                        opened = task.result()
+                    except Exception as e:
+                        # Whatever the error, settle the breaker claim, or a
+                        # half-open breaker would never admit another call
+                        self._record_failure(provider, e)
+                        last_error = e
+                        continue
+                    
+                    provider.breaker.record_success()
+                    self._requests.inc(provider=provider.name, outcome="success")
+                    if hedged and provider is not primary:
+                        self._hedge_wins.inc()
+                    return opened
+                
+                if not attempts and providers:
+                    launch()
+        finally:
+            await self._cancel_attempts(attempts)
+        
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error streaming AI response: {str(last_error)}"
+        )
+
+    async def _cancel_attempts(self, attempts: Dict[asyncio.Task, LLMProvider]) -> None:
+        """Abandon the requests that lost the race"""
+        cancelled = []
+        for task, provider in attempts.items():
+            if not task.done():
+                task.cancel()
+                cancelled.append(task)
+                # An abandoned trial call says nothing about the provider
+                provider.breaker.release()
+                self._requests.inc(provider=provider.name, outcome="cancelled")
+            elif task.cancelled():
+                provider.breaker.release()
+            elif task.exception() is None:
+                # Finished in the same instant as the winner
+                provider.breaker.record_success()
+                await task.result()[2].aclose()
+                self._requests.inc(provider=provider.name, outcome="cancelled")
+            else:
+                self._record_failure(provider, task.exception())
+        # Let cancelled requests close their connections before moving on
+        await asyncio.gather(*cancelled, return_exceptions=True)
 
 # Initialize the service
 ai_service = AIService()
\ No newline at end of file
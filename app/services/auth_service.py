@@ -3,11 +3,12 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
+from app.core.cache import principal_cache
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import create_access_token, get_password_hash_async, verify_password_async
 from app.db.base import get_db
 from app.db.repositories.user_repository import user_repository
 from app.schemas.auth import Token, UserCreate, User
@@ -17,20 +18,20 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 class AuthService:
     @staticmethod
-    async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
         """Authenticate a user by email and password"""
-        user = user_repository.get_by_email(db, email=email)
+        user = await user_repository.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
         return user
     
     @staticmethod
-    async def create_user(db: Session, user_data: UserCreate) -> User:
+    async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         """Create a new user"""
         # Check if user already exists
-        existing_user = user_repository.get_by_email(db, email=user_data.email)
+        existing_user = await user_repository.get_by_email(db, email=user_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -38,13 +39,13 @@ class AuthService:
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         # Fix: Use a dictionary with the correct field names that match the User model
         user_data_dict = {
             "email": user_data.email,
             "hashed_password": hashed_password
         }
-        user = user_repository.create(db, obj_in=user_data_dict)
+        user = await user_repository.create(db, obj_in=user_data_dict)
         return user
     
     @staticmethod
@@ -58,7 +59,7 @@ class AuthService:
     
     @staticmethod
     async def get_current_user(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         token: str = Depends(oauth2_scheme)
     ) -> User:
         """Get the current authenticated user"""
@@ -74,12 +75,21 @@ class AuthService:
             user_id: str = payload.get("sub")
             if user_id is None:
                 raise credentials_exception
-        except JWTError:
+            user_id = UUID(user_id)
+        except (JWTError, ValueError):
             raise credentials_exception
         
-        user = user_repository.get(db, id=user_id)
-        if user is None:
+        user = principal_cache.get(user_id)
+        if user is not None:
+            return user
+        
+        db_user = await user_repository.get(db, id=user_id)
+        if db_user is None:
             raise credentials_exception
+        
+        # Cache a detached snapshot rather than the session-bound ORM object
+        user = User.model_validate(db_user)
+        principal_cache.set(user_id, user)
         return user
 
 auth_service = AuthService()
\ No newline at end of file
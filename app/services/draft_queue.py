@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DraftHandler = Callable[[UUID], Awaitable[None]]
+
+# Lower ranks are drafted first; within a rank the oldest ticket goes first
+STATUS_PRIORITY = {"open": 0, "in_progress": 1}
+
+@dataclass(order=True)
+class DraftJob:
+    priority: Tuple[int, float]
+    sequence: int
+    ticket_id: UUID = field(compare=False)
+    version: int = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+class DraftQueue:
+    """
+    In-process priority queue of AI draft replies, drained by a fixed pool of
+    workers so at most `workers` drafts are generated at once.
+
+    Only the most recent job per ticket is worked on: a job that was
+    superseded by a newer message before a worker got to it is skipped.
+    Failed jobs are retried with exponential backoff.
+    """
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_attempts: int,
+        retry_backoff: float
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handler: Optional[DraftHandler] = None
+        self._latest: Dict[UUID, int] = {}
+        self._versions = itertools.count()
+        self._sequence = itertools.count()
+
+        metrics.gauge(
+            "ai_draft_queue_depth", "AI draft jobs waiting for a worker",
+            callback=lambda: self._queue.qsize() if self._queue is not None else 0
+        )
+        self._wait_time = metrics.histogram(
+            "ai_draft_wait_seconds", "Time AI draft jobs spent queued before a worker picked them up",
+            buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+        )
+        self._jobs = metrics.counter(
+            "ai_draft_jobs_total", "AI draft jobs by outcome", labelnames=("outcome",)
+        )
+
+    async def start(self, handler: DraftHandler) -> None:
+        """Start the worker pool; `handler` generates the draft for a ticket id"""
+        if self._tasks:
+            return
+        self._handler = handler
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._latest.clear()
+
+    async def enqueue(self, ticket_id: UUID, created_at: datetime, status: Optional[str]) -> bool:
+        """
+        Queue a draft for a ticket, superseding any job already queued for it.
+
+        A coroutine so background tasks run it on the event loop rather than
+        in the threadpool; the queue is not thread-safe.
+        """
+        if self._queue is None or self._queue.qsize() >= self.max_queue:
+            self._jobs.inc(outcome="dropped")
+            return False
+
+        version = next(self._versions)
+        self._latest[ticket_id] = version
+        priority = (STATUS_PRIORITY.get(status, len(STATUS_PRIORITY)), created_at.timestamp())
+        self._queue.put_nowait(DraftJob(
+            priority=priority,
+            sequence=next(self._sequence),
+            ticket_id=ticket_id,
+            version=version,
+            enqueued_at=time.perf_counter(),
+        ))
+        self._jobs.inc(outcome="enqueued")
+        return True
+
+    def _retry(self, job: DraftJob) -> None:
+        if self._queue is not None and self._latest.get(job.ticket_id) == job.version:
+            self._queue.put_nowait(job)
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            job: DraftJob = await queue.get()
+            try:
+                if self._latest.get(job.ticket_id) != job.version:
+                    self._jobs.inc(outcome="stale")
+                    continue
+
+                if job.attempts == 0:
+                    self._wait_time.observe(time.perf_counter() - job.enqueued_at)
+                job.attempts += 1
+                try:
+                    await self._handler(job.ticket_id)
+                except Exception:
+                    if job.attempts >= self.max_attempts:
+                        logger.exception("AI draft for ticket %s failed, giving up", job.ticket_id)
+                        self._jobs.inc(outcome="failed")
+                        if self._latest.get(job.ticket_id) == job.version:
+                            del self._latest[job.ticket_id]
+                    else:
+                        delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                        logger.warning(
+                            "AI draft for ticket %s failed, retrying in %.1f s", job.ticket_id, delay
+                        )
+                        self._jobs.inc(outcome="retried")
+                        asyncio.get_running_loop().call_later(delay, self._retry, job)
+                    continue
+
+                self._jobs.inc(outcome="completed")
+                if self._latest.get(job.ticket_id) == job.version:
+                    del self._latest[job.ticket_id]
+            finally:
+                queue.task_done()
+
+# Initialize the queue
+draft_queue = DraftQueue(
+    workers=settings.AI_DRAFT_WORKERS,
+    max_queue=settings.AI_DRAFT_MAX_QUEUE,
+    max_attempts=settings.AI_DRAFT_MAX_ATTEMPTS,
+    retry_backoff=settings.AI_DRAFT_RETRY_BACKOFF_SECONDS,
+)
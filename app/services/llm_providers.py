@@ -0,0 +1,150 @@
+import asyncio
+import json
+import math
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, List, Optional
+
+import aiohttp
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+class ProviderError(Exception):
+    """An upstream LLM call failed; counts against the provider's circuit breaker"""
+
+class LLMProvider:
+    """
+    One upstream model that AIService can route requests to.
+
+    Subclasses implement `complete` and `stream` for a provider's API. Each
+    provider keeps its own circuit breaker and a window of recent
+    time-to-first-token samples used to decide when to hedge.
+    """
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        first_token_timeout: float,
+        failure_threshold: int,
+        reset_timeout: float,
+        window: int = 200
+    ):
+        self.name = name
+        self.model = model
+        self.first_token_timeout = first_token_timeout
+        self.breaker = CircuitBreaker(f"llm_{name}", failure_threshold, reset_timeout)
+        self._ttft: Deque[float] = deque(maxlen=window)
+
+    def observe_ttft(self, seconds: float) -> None:
+        self._ttft.append(seconds)
+
+    def ttft_percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        """The q-th quantile of recent time-to-first-token, None until there are enough samples"""
+        if len(self._ttft) < min_samples:
+            return None
+        samples = sorted(self._ttft)
+        return samples[min(len(samples) - 1, math.ceil(q * len(samples)) - 1)]
+
+    async def complete(self, session: aiohttp.ClientSession, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, session: aiohttp.ClientSession, prompt: str) -> AsyncGenerator[str, None]:
+        raise NotImplementedError
+
+class OpenAICompatibleProvider(LLMProvider):
+    """A chat completions API in the OpenAI format, which Groq serves"""
+    def __init__(self, name: str, api_url: str, api_key: str, model: str, **kwargs):
+        super().__init__(name, model, **kwargs)
+        self.api_url = api_url
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def complete(self, session: aiohttp.ClientSession, prompt: str) -> str:
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+
+        try:
+            async with session.post(self.api_url, headers=self.headers, json=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise ProviderError(f"{self.name} API error: {error_text}")
+
+                result = await response.json()
+                return result["choices"][0]["message"]["content"]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ProviderError(f"Error communicating with {self.name}: {str(e)}") from e
+
+    async def stream(self, session: aiohttp.ClientSession, prompt: str) -> AsyncGenerator[str, None]:
+        """Yield each token delta as soon as it arrives in the upstream event stream"""
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True
+        }
+
+        try:
+            async with session.post(self.api_url, headers=self.headers, json=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise ProviderError(f"{self.name} API error: {error_text}")
+
+                # Upstream events are newline delimited "data: {...}" lines
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    chunk = self._parse_stream_chunk(data)
+                    if chunk:
+                        yield chunk
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ProviderError(f"Error streaming from {self.name}: {str(e)}") from e
+
+    @staticmethod
+    def _parse_stream_chunk(data: str) -> str:
+        """Extract the content delta from a single streamed completion event"""
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            return ""
+
+        choices = event.get("choices") or []
+        if not choices:
+            return ""
+        return choices[0].get("delta", {}).get("content") or ""
+
+def configured_providers() -> List[LLMProvider]:
+    """The primary provider and, when configured, the fallback, in routing order"""
+    breaker_settings: Dict[str, float] = {
+        "failure_threshold": settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+        "reset_timeout": settings.LLM_CIRCUIT_RESET_SECONDS,
+    }
+    providers: List[LLMProvider] = [
+        OpenAICompatibleProvider(
+            "primary",
+            api_url=settings.GROQ_API_URL,
+            api_key=settings.GROQ_API_KEY,
+            model=settings.GROQ_MODEL,
+            first_token_timeout=settings.LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+            **breaker_settings
+        )
+    ]
+    if settings.LLM_FALLBACK_API_URL or settings.LLM_FALLBACK_MODEL:
+        # A second region, vendor or just a different model on the same API
+        providers.append(OpenAICompatibleProvider(
+            "fallback",
+            api_url=settings.LLM_FALLBACK_API_URL or settings.GROQ_API_URL,
+            api_key=settings.LLM_FALLBACK_API_KEY or settings.GROQ_API_KEY,
+            model=settings.LLM_FALLBACK_MODEL or settings.GROQ_MODEL,
+            first_token_timeout=settings.LLM_FALLBACK_FIRST_TOKEN_TIMEOUT_SECONDS,
+            **breaker_settings
+        ))
+    return providers
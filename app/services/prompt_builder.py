@@ -0,0 +1,153 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db.models import Message, Ticket
+
+# Words and individual punctuation marks; tracks BPE token counts closely
+# enough for budgeting without shipping a tokenizer
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+SUMMARY_LINE_MAX_TOKENS = 40
+
+def count_tokens(text: str) -> int:
+    """Approximate the number of model tokens in a piece of text"""
+    return len(_TOKEN_RE.findall(text))
+
+@dataclass
+class BuiltPrompt:
+    prompt: str
+    prompt_tokens: int
+    verbatim_messages: int
+    summary: Optional[str]
+    summarized_until: Optional[datetime]
+    summary_changed: bool
+    # The ticket's summarized_until the summary was extended from
+    previous_summarized_until: Optional[datetime] = None
+    # Answer of a near-identical resolved ticket, sent instead of calling the LLM
+    answer: Optional[str] = None
+
+class PromptBuilder:
+    """
+    Builds the completion prompt for a ticket within a token budget.
+
+    Recent turns are kept verbatim, newest first, until the budget is spent.
+    Older turns are folded into a rolling per-ticket summary; only turns
+    newer than `ticket.summarized_until` are ever folded, so the summary is
+    extended incrementally instead of being recomputed.
+    """
+    def __init__(self, max_tokens: int, summary_max_tokens: int):
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+
+    @staticmethod
+    def _speaker(message: Message) -> str:
+        return "Support Assistant" if message.is_ai else "Customer"
+
+    def _format_turn(self, message: Message) -> str:
+        return f"{self._speaker(message)}: {message.content}"
+
+    def _summarize_turn(self, message: Message) -> str:
+        """Condense a turn to its first sentence, capped in length"""
+        first_sentence = _SENTENCE_END_RE.split(message.content.strip(), 1)[0]
+        words = first_sentence.split()
+        if count_tokens(first_sentence) > SUMMARY_LINE_MAX_TOKENS:
+            first_sentence = " ".join(words[:SUMMARY_LINE_MAX_TOKENS // 2]) + " ..."
+        return f"- {self._speaker(message)}: {first_sentence}"
+
+    def _trim_summary(self, lines: List[str]) -> List[str]:
+        """Drop the oldest summary lines until the summary fits its budget"""
+        total = sum(count_tokens(line) for line in lines)
+        while lines and total > self.summary_max_tokens:
+            total -= count_tokens(lines.pop(0))
+        return lines
+
+    @staticmethod
+    def _render(
+        ticket: Ticket,
+        summary: Optional[str],
+        turns: List[str],
+        latest_message: str,
+        context: Optional[str] = None
+    ) -> str:
+        message_history = "\n".join(turns)
+        summary_section = f"Summary of earlier conversation:\n{summary}\n\n" if summary else ""
+        context_section = (
+            f"A similar, already resolved issue was answered with:\n{context}\n\n" if context else ""
+        )
+        return f"""
+        You are a helpful customer support assistant.
+        The customer has the following issue: {ticket.description}
+
+        {context_section}{summary_section}Previous messages:
+        {message_history}
+
+        {"Customer's latest message: " + latest_message if latest_message else ""}
+
+        Provide a helpful response that addresses their concern:
+        """
+
+    def build(self, ticket: Ticket, messages: List[Message], context: Optional[str] = None) -> BuiltPrompt:
+        """
+        Build a prompt from the ticket's summary and its not yet summarized
+        messages, plus optional `context` such as a related earlier answer
+        """
+        summarized_until = ticket.summarized_until
+        pending = [
+            msg for msg in messages
+            if summarized_until is None or msg.created_at > summarized_until
+        ]
+
+        latest_message = ""
+        if pending and not pending[-1].is_ai:
+            latest_message = pending[-1].content
+
+        if context and count_tokens(context) > self.summary_max_tokens:
+            context = " ".join(context.split()[:self.summary_max_tokens // 2]) + " ..."
+
+        summary_lines = ticket.summary.split("\n") if ticket.summary else []
+        base_tokens = count_tokens(self._render(ticket, None, [], latest_message, context))
+        budget = self.max_tokens - base_tokens - self.summary_max_tokens
+
+        # Keep the newest turns verbatim; the latest one is always kept
+        verbatim: List[str] = []
+        used = 0
+        cutoff = len(pending)
+        for index in range(len(pending) - 1, -1, -1):
+            turn = self._format_turn(pending[index])
+            tokens = count_tokens(turn)
+            if verbatim and used + tokens > budget:
+                break
+            verbatim.insert(0, turn)
+            used += tokens
+            cutoff = index
+
+        # Fold whatever did not fit into the rolling summary
+        folded = pending[:cutoff]
+        summary_changed = bool(folded)
+        if folded:
+            summary_lines = self._trim_summary(
+                summary_lines + [self._summarize_turn(msg) for msg in folded]
+            )
+            summarized_until = folded[-1].created_at
+
+        summary = "\n".join(summary_lines) or None
+        prompt = self._render(ticket, summary, verbatim, latest_message, context)
+        return BuiltPrompt(
+            prompt=prompt,
+            prompt_tokens=count_tokens(prompt),
+            verbatim_messages=len(verbatim),
+            summary=summary,
+            summarized_until=summarized_until,
+            summary_changed=summary_changed,
+            previous_summarized_until=ticket.summarized_until,
+        )
+
+# Initialize the builder
+prompt_builder = PromptBuilder(
+    max_tokens=settings.PROMPT_MAX_TOKENS,
+    summary_max_tokens=settings.PROMPT_SUMMARY_MAX_TOKENS,
+)
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import uuid
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, List, Optional, Set, Tuple
+
+CompletionCallback = Callable[[str], Awaitable[None]]
+
+class ResponseStream:
+    """
+    A single upstream AI generation running in a background task.
+
+    Chunks are buffered as they arrive so the complete text can be persisted
+    once the generation finishes, independently of the HTTP client reading it.
+    """
+    # Strong references so running generations are not garbage collected
+    _running: Set[asyncio.Task] = set()
+
+    def __init__(
+        self,
+        source: AsyncIterator[str],
+        on_complete: Optional[CompletionCallback] = None,
+        cancel_on_disconnect: bool = False
+    ):
+        self.id = uuid.uuid4().hex
+        self.chunks: List[str] = []
+        self.size = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.subscribers = 0
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self._on_complete: Optional[CompletionCallback] = None
+        self._completion_claimed = False
+        self._changed = asyncio.Event()
+        if on_complete is not None:
+            self.claim_completion(on_complete)
+        self._task = self._spawn(self._run(source))
+
+    @classmethod
+    def _spawn(cls, coro: Awaitable[None]) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        cls._running.add(task)
+        task.add_done_callback(cls._running.discard)
+        return task
+
+    @property
+    def text(self) -> str:
+        """The text generated so far"""
+        return "".join(self.chunks)
+
+    def claim_completion(self, callback: CompletionCallback) -> bool:
+        """
+        Register the callback that receives the complete text, e.g. to save it.
+
+        Only the first claim wins, so a generation shared by several requests
+        is handled exactly once. If the generation has already finished the
+        callback runs right away. Returns whether this claim won.
+        """
+        if self._completion_claimed:
+            return False
+        self._completion_claimed = True
+        if not self.done:
+            self._on_complete = callback
+        elif self.error is None:
+            self._spawn(callback(self.text))
+        return True
+
+    async def _run(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self.size += len(chunk)
+                self._notify()
+            self.finished_at = time.perf_counter()
+            if self._on_complete:
+                await self._on_complete(self.text)
+        except asyncio.CancelledError as e:
+            self.error = e
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def cancel(self) -> None:
+        """Cancel the upstream generation"""
+        if not self.done:
+            # Mark it failed now; the task only sees the cancellation on its next step
+            self.error = asyncio.CancelledError()
+            self._task.cancel()
+
+    async def wait(self) -> str:
+        """Wait for the generation to finish and return its text, raising its error if any"""
+        while not self.done:
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+    async def ready(self) -> None:
+        """
+        Wait for the first chunk, raising the error if the generation failed
+        before producing one, e.g. because it was shed by admission control
+        """
+        while not self.chunks and not self.done:
+            await self._changed.wait()
+        if not self.chunks and isinstance(self.error, Exception):
+            raise self.error
+
+    async def subscribe(self, start: int = 0) -> AsyncGenerator[Tuple[int, str], None]:
+        """
+        Yield (index, chunk) pairs for buffered chunks from `start`, then for
+        live chunks until the generation ends
+        """
+        index = start
+        self.subscribers += 1
+        try:
+            while True:
+                if index < len(self.chunks):
+                    yield index, self.chunks[index]
+                    index += 1
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.cancel_on_disconnect:
+                self.cancel()
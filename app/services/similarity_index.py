@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.base import SessionLocal
+from app.db.models import Ticket
+from app.db.repositories.ticket_repository import ticket_repository
+
+logger = logging.getLogger(__name__)
+
+# Tickets in these states have a final answer worth reusing
+RESOLVED_STATUSES = ("resolved", "closed")
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+class HashingFeaturizer:
+    """
+    Turns text into a fixed-size, L2-normalized float32 vector without a
+    vocabulary or model: word unigrams and bigrams are hashed into `dim`
+    signed buckets and weighted with sublinear term frequency.
+    """
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def transform(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+
+        # crc32 is stable across processes, unlike hash()
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in features),
+            dtype=np.uint32, count=len(features)
+        )
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs)
+
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+@dataclass
+class SimilarMatch:
+    ticket_id: UUID
+    score: float
+    answer: str
+
+class SimilarityIndex:
+    """
+    In-process cosine similarity index over resolved tickets.
+
+    Each row of a preallocated float32 matrix holds the normalized vector of
+    a resolved ticket's description, next to that ticket's final reply, so a
+    query is a single matrix-vector product. The index is loaded at startup,
+    kept current as tickets are resolved or reopened through this worker and
+    reloaded periodically to pick up changes made through other workers; when
+    full, the least recently added ticket is replaced.
+    """
+    def __init__(self, featurizer: HashingFeaturizer, max_size: int):
+        self.featurizer = featurizer
+        self.max_size = max_size
+        self._vectors = np.zeros((0, featurizer.dim), dtype=np.float32)
+        self._ids: List[UUID] = []
+        self._answers: List[str] = []
+        # Row of each ticket, in the order they were added
+        self._rows: "OrderedDict[UUID, int]" = OrderedDict()
+        self._reload_task: Optional[asyncio.Task] = None
+        # A one-off rebuild requested by a bulk change, and whether another
+        # change arrived while it was running
+        self._pending_load: Optional[asyncio.Task] = None
+        self._load_again = False
+
+        metrics.gauge(
+            "similarity_index_size", "Resolved tickets in the similarity index",
+            callback=lambda: len(self._ids)
+        )
+        self._build_time = metrics.gauge(
+            "similarity_index_build_seconds", "Time the last full similarity index build took"
+        )
+        self._query_time = metrics.histogram(
+            "similarity_query_seconds", "Time spent searching the similarity index",
+            buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+        )
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _grow(self, rows: int) -> None:
+        capacity = min(self.max_size, max(rows, 2 * len(self._vectors), 64))
+        vectors = np.zeros((capacity, self.featurizer.dim), dtype=np.float32)
+        vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = vectors
+
+    def _featurize(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.featurizer.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row] = self.featurizer.transform(text)
+        return vectors
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Rebuild the index from the `max_size` most recently resolved tickets.
+
+        Featurizing runs in a worker thread so a large rebuild does not stall
+        the event loop; the new index replaces the old one once complete.
+        """
+        started_at = time.perf_counter()
+        rows = await ticket_repository.get_resolved_answers(
+            db, statuses=RESOLVED_STATUSES, limit=self.max_size
+        )
+        # Newest first from the database; oldest first here, so the least
+        # recently resolved ticket is the first one replaced when full
+        rows.reverse()
+
+        loop = asyncio.get_running_loop()
+        self._vectors = await loop.run_in_executor(
+            None, self._featurize, [description for _, description, _ in rows]
+        )
+        self._ids = [ticket_id for ticket_id, _, _ in rows]
+        self._answers = [answer for _, _, answer in rows]
+        self._rows = OrderedDict((ticket_id, row) for row, ticket_id in enumerate(self._ids))
+
+        elapsed = time.perf_counter() - started_at
+        self._build_time.set(elapsed)
+        logger.info("Built similarity index of %d resolved tickets in %.1f ms", len(rows), elapsed * 1000)
+
+    async def start(self, reload_interval: float) -> None:
+        """Reload the index every `reload_interval` seconds; 0 disables it"""
+        if self._reload_task is None and reload_interval > 0:
+            self._reload_task = asyncio.create_task(self._reload(reload_interval))
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._reload_task, self._pending_load) if task is not None]
+        self._reload_task = self._pending_load = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def schedule_load(self) -> None:
+        """
+        Rebuild the index in the background, e.g. after a bulk change.
+
+        Requests made while a rebuild is running trigger one more rebuild
+        once it finishes, so the last change is always picked up.
+        """
+        if self._pending_load is not None and not self._pending_load.done():
+            self._load_again = True
+            return
+        self._pending_load = asyncio.create_task(self._load_pending())
+
+    async def _load_pending(self) -> None:
+        self._load_again = True
+        while self._load_again:
+            self._load_again = False
+            await self._load_fresh()
+
+    async def _load_fresh(self) -> None:
+        try:
+            async with SessionLocal() as db:
+                await self.load(db)
+        except Exception:
+            # Keep serving the current index until the next attempt
+            logger.exception("Reloading the similarity index failed")
+
+    async def _reload(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._load_fresh()
+
+    def add(self, ticket_id: UUID, text: str, answer: str) -> None:
+        """Index a resolved ticket, replacing its previous entry if any"""
+        vector = self.featurizer.transform(text)
+        row = self._rows.pop(ticket_id, None)
+        if row is None:
+            if len(self._ids) >= self.max_size:
+                _, row = self._rows.popitem(last=False)
+                self._ids[row] = ticket_id
+            else:
+                row = len(self._ids)
+                if row >= len(self._vectors):
+                    self._grow(row + 1)
+                self._ids.append(ticket_id)
+                self._answers.append(answer)
+        self._vectors[row] = vector
+        self._answers[row] = answer
+        self._rows[ticket_id] = row
+
+    def remove(self, ticket_id: UUID) -> None:
+        """Drop a ticket, e.g. one that was reopened"""
+        row = self._rows.pop(ticket_id, None)
+        if row is None:
+            return
+        # Move the last row into the gap to keep the matrix dense
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._vectors[row] = self._vectors[last]
+            self._ids[row] = moved
+            self._answers[row] = self._answers[last]
+            self._rows[moved] = row
+        self._ids.pop()
+        self._answers.pop()
+
+    def search(self, text: str, k: int = 1, exclude: Optional[UUID] = None) -> List[SimilarMatch]:
+        """The `k` most similar resolved tickets, best first"""
+        if not self._ids:
+            return []
+        started_at = time.perf_counter()
+        scores = self._vectors[:len(self._ids)] @ self.featurizer.transform(text)
+        if exclude is not None and exclude in self._rows:
+            scores[self._rows[exclude]] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        self._query_time.observe(time.perf_counter() - started_at)
+        return [
+            SimilarMatch(ticket_id=self._ids[row], score=float(scores[row]), answer=self._answers[row])
+            for row in top
+            if np.isfinite(scores[row])
+        ]
+
+    def best_match(self, text: str, threshold: float, exclude: Optional[UUID] = None) -> Optional[SimilarMatch]:
+        matches = self.search(text, k=1, exclude=exclude)
+        if matches and matches[0].score >= threshold:
+            return matches[0]
+        return None
+
+    async def on_ticket_status_changed(self, db: AsyncSession, ticket: Ticket) -> None:
+        """Keep the index in step with a ticket whose status just changed"""
+        if ticket.status not in RESOLVED_STATUSES or not ticket.resolved_by_staff:
+            self.remove(ticket.id)
+            return
+        rows = await ticket_repository.get_resolved_answers(
+            db, statuses=RESOLVED_STATUSES, ticket_id=ticket.id
+        )
+        for ticket_id, description, answer in rows:
+            self.add(ticket_id, description, answer)
+
+# Initialize the index
+similarity_index = SimilarityIndex(
+    HashingFeaturizer(dim=settings.SIMILARITY_DIM),
+    max_size=settings.SIMILARITY_INDEX_MAX_SIZE,
+)
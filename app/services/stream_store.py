@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.response_stream import ResponseStream
+
+class ResponseStreamStore:
+    """
+    Keeps in-progress and recently finished AI generations addressable by id
+    so a client that lost its SSE connection can resume where it left off.
+
+    Bounded by the total buffered text and by age; the oldest generations are
+    evicted first. Eviction only forgets a generation, readers already
+    attached to it are unaffected.
+    """
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._streams: "OrderedDict[str, Tuple[float, UUID, ResponseStream]]" = OrderedDict()
+
+        self._resumed = metrics.counter(
+            "ai_stream_resumes_total", "AI streams resumed from Last-Event-ID without a new upstream call"
+        )
+        metrics.gauge(
+            "ai_stream_store_bytes", "Text buffered by resumable AI streams, counted in characters",
+            callback=lambda: sum(stream.size for _, _, stream in self._streams.values())
+        )
+
+    def add(self, ticket_id: UUID, stream: ResponseStream) -> None:
+        if stream.id in self._streams:
+            return
+        self._streams[stream.id] = (time.monotonic(), ticket_id, stream)
+        self._evict()
+
+    def _evict(self) -> None:
+        expired_before = time.monotonic() - self.ttl
+        while self._streams:
+            added_at, _, _ = next(iter(self._streams.values()))
+            if added_at >= expired_before:
+                break
+            self._streams.popitem(last=False)
+
+        total = sum(stream.size for _, _, stream in self._streams.values())
+        while self._streams and total > self.max_bytes:
+            _, _, stream = self._streams.popitem(last=False)[1]
+            total -= stream.size
+
+    def resume(self, ticket_id: UUID, last_event_id: Optional[str]) -> Optional[Tuple[ResponseStream, int]]:
+        """
+        Find the generation a `<stream id>:<chunk index>` event id belongs to.
+
+        Returns the stream and the index of the first chunk the client has
+        not seen, or None when the id is unknown, evicted, for another ticket
+        or the generation failed or was cancelled; the caller then starts a
+        new one.
+        """
+        if not last_event_id:
+            return None
+        stream_id, _, index = last_event_id.partition(":")
+        if not index.isdigit():
+            return None
+
+        self._evict()
+        entry = self._streams.get(stream_id)
+        if entry is None or entry[1] != ticket_id:
+            return None
+        if entry[2].error is not None:
+            # Replaying it would end the response without [DONE]
+            del self._streams[stream_id]
+            return None
+        self._resumed.inc()
+        return entry[2], int(index) + 1
+
+# Initialize the store
+response_stream_store = ResponseStreamStore(
+    max_bytes=settings.AI_STREAM_STORE_MAX_BYTES,
+    ttl=settings.AI_STREAM_STORE_TTL_SECONDS,
+)
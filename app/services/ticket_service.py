@@ -1,17 +1,46 @@
-from typing import List, Optional
+import logging
+import time
+from datetime import datetime
+from typing import AsyncGenerator, Callable, List, Optional, Tuple
 from uuid import UUID
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.base import get_db
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.http_cache import make_etag
+from app.core.metrics import metrics
+from app.core.pagination import decode_cursor, encode_cursor
+from app.db.base import SessionLocal
+from app.db.models import Ticket as TicketModel
+from app.db.notifications import Subscription, message_broker
 from app.db.repositories.ticket_repository import ticket_repository
 from app.schemas.ticket import Ticket, TicketCreate, TicketUpdate, TicketWithMessages
+from app.schemas.auth import User
 from app.schemas.message import Message, MessageCreate
-from app.services.auth_service import auth_service
+from app.services.ai_response_cache import ai_response_cache
+from app.services.ai_service import ai_service
+from app.services.draft_queue import draft_queue
+from app.services.prompt_builder import BuiltPrompt, prompt_builder
+from app.services.response_stream import CompletionCallback, ResponseStream
+from app.services.similarity_index import RESOLVED_STATUSES, similarity_index
+from app.services.stream_store import response_stream_store
+
+logger = logging.getLogger(__name__)
+
+ai_response_seconds = metrics.histogram(
+    "ai_response_seconds", "Time from starting an AI reply until it was complete",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+)
+answers_reused_counter = metrics.counter(
+    "ai_answers_reused_total", "AI replies answered from a similar resolved ticket without an LLM call"
+)
+context_matches_counter = metrics.counter(
+    "ai_similar_context_total", "AI prompts that included the answer of a similar resolved ticket"
+)
 
 class TicketService:
     @staticmethod
     async def create_ticket(
-        db: Session,
+        db: AsyncSession,
         ticket_in: TicketCreate,
         current_user: UUID
     ) -> Ticket:
@@ -20,70 +49,353 @@ class TicketService:
         ticket_data = ticket_in.dict()
         
         # Create the ticket using the repository (pass user_id directly)
-        return ticket_repository.create(db, obj_in={**ticket_data, "user_id": current_user})
+        return await ticket_repository.create(db, obj_in={**ticket_data, "user_id": current_user})
     
     @staticmethod
     async def get_user_tickets(
-        db: Session,
+        db: AsyncSession,
         current_user: UUID,
-        skip: int = 0,
-        limit: int = 100
-    ) -> List[Ticket]:
-        """Get all tickets for a user"""
-        return ticket_repository.get_by_user_id(db, user_id=current_user)
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Tuple[List[Ticket], Optional[str]]:
+        """Get a page of a user's tickets and the cursor for the next page"""
+        after = decode_cursor(cursor) if cursor else None
+        
+        # Fetch one extra row to learn whether another page exists
+        tickets = await ticket_repository.get_page_by_user_id(
+            db, user_id=current_user, limit=limit + 1, after=after, status=status
+        )
+        
+        next_cursor = None
+        if len(tickets) > limit:
+            tickets = tickets[:limit]
+            next_cursor = encode_cursor(tickets[-1].created_at, tickets[-1].id)
+        return tickets, next_cursor
+    
+    @staticmethod
+    async def get_tickets_etag(
+        db: AsyncSession,
+        current_user: UUID,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> str:
+        """ETag for a page of a user's tickets, computed without loading them"""
+        latest_update, count = await ticket_repository.get_list_version(
+            db, user_id=current_user, status=status
+        )
+        return make_etag("tickets", current_user, latest_update, count, limit, cursor, status)
+    
+    @staticmethod
+    async def get_ticket_etag(
+        db: AsyncSession,
+        ticket_id: UUID,
+        current_user: User,
+        message_limit: int = 50,
+        before: Optional[str] = None,
+        after_id: Optional[UUID] = None
+    ) -> Optional[str]:
+        """ETag for a ticket view, or None when the ticket is not visible to the user"""
+        owner_id = None if current_user.role == "admin" else current_user.id
+        version = await ticket_repository.get_version(db, ticket_id=ticket_id, owner_id=owner_id)
+        if version is None:
+            return None
+        updated_at, latest_message_id = version
+        return TicketService._ticket_etag(
+            ticket_id, updated_at, latest_message_id, message_limit, before, after_id
+        )
+    
+    @staticmethod
+    def _ticket_etag(
+        ticket_id: UUID,
+        updated_at: datetime,
+        latest_message_id: Optional[UUID],
+        message_limit: int,
+        before: Optional[str],
+        after_id: Optional[UUID]
+    ) -> str:
+        return make_etag(
+            "ticket", ticket_id, updated_at, latest_message_id, message_limit, before, after_id
+        )
     
     @staticmethod
     async def get_ticket(
-        db: Session,
+        db: AsyncSession,
         ticket_id: UUID,
-        current_user: UUID
-    ) -> Optional[TicketWithMessages]:
-        """Get a specific ticket with its messages"""
-        ticket = ticket_repository.get(db, id=ticket_id)
+        current_user: User,
+        message_limit: int = 50,
+        before: Optional[str] = None,
+        after_id: Optional[UUID] = None
+    ) -> Tuple[TicketWithMessages, str]:
+        """Get a specific ticket with a window of its messages, and its ETag"""
+        # Admins may read any ticket, everyone else only their own; tickets
+        # the user cannot see are reported as missing
+        owner_id = None if current_user.role == "admin" else current_user.id
+        window = await ticket_repository.get_with_message_window(
+            db,
+            ticket_id=ticket_id,
+            limit=message_limit,
+            owner_id=owner_id,
+            before=decode_cursor(before) if before else None,
+            after_id=after_id
+        )
         
+        ticket, messages = window.ticket, window.messages
         if not ticket:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Ticket not found"
             )
-        
-        # Check if user has access to this ticket
-        if str(ticket.user_id) != str(current_user) and current_user.role != "admin":
+        if not window.anchor_found:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="after_id is not a message on this ticket"
             )
         
-        messages = ticket_repository.get_messages(db, ticket_id=ticket_id)
+        etag = TicketService._ticket_etag(
+            ticket_id, ticket.updated_at, window.latest_message_id, message_limit, before, after_id
+        )
+        
+        messages_cursor = None
+        if len(messages) > message_limit:
+            if after_id is not None:
+                # Syncing forwards: the client asks again after the last one
+                messages = messages[:message_limit]
+            else:
+                messages = messages[1:]
+                messages_cursor = encode_cursor(messages[0].created_at, messages[0].id)
         
         return TicketWithMessages(
-            **ticket.__dict__,
-            messages=messages
-        )
+            id=ticket.id,
+            user_id=ticket.user_id,
+            title=ticket.title,
+            description=ticket.description,
+            status=ticket.status,
+            created_at=ticket.created_at,
+            updated_at=ticket.updated_at,
+            messages=messages,
+            messages_cursor=messages_cursor
+        ), etag
+    
+    @staticmethod
+    async def get_visible_ticket(db: AsyncSession, ticket_id: UUID, current_user: User) -> TicketModel:
+        """Load a ticket the user may act on; others' tickets are reported as missing"""
+        ticket = await ticket_repository.get(db, id=ticket_id)
+        if not ticket or (str(ticket.user_id) != str(current_user.id) and current_user.role != "admin"):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ticket not found"
+            )
+        return ticket
     
     @staticmethod
     async def add_message(
-        db: Session,
+        db: AsyncSession,
         ticket_id: UUID,
         message: MessageCreate,
-        current_user: UUID
+        current_user: User,
+        background_tasks: Optional[BackgroundTasks] = None
     ) -> Message:
         """Add a message to a ticket"""
-        ticket = ticket_repository.get(db, id=ticket_id)
+        if message.is_ai and current_user.role != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only staff can post messages as the assistant"
+            )
+        ticket = await TicketService.get_visible_ticket(db, ticket_id, current_user)
         
-        if not ticket:
+        db_message = await ticket_repository.add_message(
+            db, ticket_id=ticket_id, message=message, durable=settings.MESSAGE_WRITE_DURABLE_ACK
+        )
+        # The conversation moved on, cached replies no longer apply
+        ai_response_cache.invalidate_ticket(ticket_id)
+        
+        # Draft the AI reply to a customer message before anyone asks for it
+        if (
+            settings.AI_DRAFTS_ENABLED
+            and background_tasks is not None
+            and not message.is_ai
+            and str(ticket.user_id) == str(current_user.id)
+        ):
+            background_tasks.add_task(
+                draft_queue.enqueue, ticket.id, ticket.created_at, ticket.status
+            )
+        return db_message
+    
+    @staticmethod
+    async def update_ticket(
+        db: AsyncSession,
+        ticket_id: UUID,
+        ticket_in: TicketUpdate,
+        current_user: User
+    ) -> Ticket:
+        """Update a ticket's title, description or status"""
+        ticket = await TicketService.get_visible_ticket(db, ticket_id, current_user)
+        
+        previous_status = ticket.status
+        update_data = ticket_in.model_dump(exclude_unset=True)
+        if "status" in update_data and update_data["status"] != previous_status:
+            # A customer closing their own ticket does not vouch for its reply
+            update_data["resolved_by_staff"] = (
+                update_data["status"] in RESOLVED_STATUSES and current_user.role == "admin"
+            )
+        ticket = await ticket_repository.update(db, db_obj=ticket, obj_in=update_data)
+        if settings.SIMILARITY_INDEX_ENABLED and ticket.status != previous_status:
+            await similarity_index.on_ticket_status_changed(db, ticket)
+        return ticket
+    
+    @staticmethod
+    async def subscribe_to_ticket(
+        db: AsyncSession,
+        ticket_id: UUID,
+        current_user: User
+    ) -> Subscription:
+        """Subscribe to new messages on a ticket the user can see"""
+        owner_id = None if current_user.role == "admin" else current_user.id
+        if await ticket_repository.get_version(db, ticket_id=ticket_id, owner_id=owner_id) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Ticket not found"
             )
+        return message_broker.subscribe(ticket_id)
+    
+    @staticmethod
+    async def build_prompt(db: AsyncSession, ticket: TicketModel) -> BuiltPrompt:
+        """
+        Build the AI prompt for a ticket without writing anything; a rolling
+        summary that moved is saved with the reply, see `_persist_ai_reply`
+        """
+        started_at = time.perf_counter()
+        # Summarized turns are already in ticket.summary, only load newer ones
+        messages = await ticket_repository.get_messages(
+            db, ticket_id=ticket.id, after=ticket.summarized_until
+        )
         
-        # Check if user has access to this ticket
-        if str(ticket.user_id) != str(current_user) and current_user.role != "admin":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
+        # Reuse the answer to a near-identical resolved ticket while the
+        # description is all the customer has said; otherwise a close enough
+        # answer goes in as context
+        context = answer = None
+        if settings.SIMILARITY_INDEX_ENABLED:
+            description_only = ticket.summary is None and not messages
+            query = ticket.description
+            if messages:
+                query = f"{ticket.description}\n{messages[-1].content}"
+            match = similarity_index.best_match(
+                query, settings.SIMILARITY_CONTEXT_THRESHOLD, exclude=ticket.id
+            )
+            if match and description_only and match.score >= settings.SIMILARITY_ANSWER_THRESHOLD:
+                answer = match.answer
+            elif match:
+                context = match.answer
+                context_matches_counter.inc()
+        
+        built = prompt_builder.build(ticket, messages, context=context)
+        built.answer = answer
+        
+        logger.info(
+            "Built AI prompt for ticket %s: %d tokens, %d verbatim turns, %.1f ms",
+            ticket.id, built.prompt_tokens, built.verbatim_messages,
+            (time.perf_counter() - started_at) * 1000
+        )
+        return built
+    
+    @staticmethod
+    def start_ai_response(ticket: TicketModel, built: BuiltPrompt) -> ResponseStream:
+        """
+        Get the AI reply for a prompt, joining an identical in-flight or
+        recently finished generation instead of starting a new one
+        """
+        key = ai_response_cache.key_for(ticket.id, ai_service.model, built.prompt)
+        ai_stream = ai_response_cache.get_or_start(
+            ticket.id,
+            key,
+            TicketService._stream_factory(
+                built, cancel_on_disconnect=settings.AI_STREAM_DISCONNECT_POLICY == "cancel"
+            ),
+            upstream=built.answer is None
+        )
+        # Save the reply once, whether it was started here, joined in flight
+        # or prepared earlier as a background draft
+        ai_stream.claim_completion(TicketService._persist_ai_reply(ticket.id, built, ai_stream))
+        # Let clients that drop mid-stream resume this generation
+        response_stream_store.add(ticket.id, ai_stream)
+        return ai_stream
+    
+    @staticmethod
+    async def generate_draft(ticket_id: UUID) -> None:
+        """Generate and cache an AI reply for a ticket without saving it"""
+        async with SessionLocal() as db:
+            ticket = await ticket_repository.get(db, id=ticket_id)
+            if ticket is None:
+                return
+            built = await TicketService.build_prompt(db, ticket)
+        
+        key = ai_response_cache.key_for(ticket_id, ai_service.model, built.prompt)
+        draft = ai_response_cache.get_or_start(
+            ticket_id,
+            key,
+            TicketService._stream_factory(built),
+            ttl=settings.AI_DRAFT_TTL_SECONDS,
+            upstream=built.answer is None
+        )
+        await draft.wait()
+    
+    @staticmethod
+    def _stream_factory(
+        built: BuiltPrompt,
+        cancel_on_disconnect: bool = False
+    ) -> Callable[[], ResponseStream]:
+        """Start the reply to a prompt, from a reused answer when there is one"""
+        def start() -> ResponseStream:
+            if built.answer is not None:
+                answers_reused_counter.inc()
+                source = TicketService._replay(built.answer)
+            else:
+                source = ai_service.stream_prompt(built.prompt)
+            return ResponseStream(source, cancel_on_disconnect=cancel_on_disconnect)
+        
+        return start
+    
+    @staticmethod
+    async def _replay(answer: str) -> AsyncGenerator[str, None]:
+        yield answer
+    
+    @staticmethod
+    def _persist_ai_reply(
+        ticket_id: UUID,
+        built: BuiltPrompt,
+        ai_stream: ResponseStream
+    ) -> CompletionCallback:
+        """
+        Callback that saves a finished AI reply as a message on the ticket,
+        along with the rolling summary its prompt was built from
+        """
+        async def persist(content: str) -> None:
+            elapsed = ai_stream.finished_at - ai_stream.started_at
+            ai_response_seconds.observe(elapsed)
+            logger.info(
+                "AI reply for ticket %s complete: %d prompt tokens, %.2f s",
+                ticket_id, built.prompt_tokens, elapsed
             )
+            # Use a dedicated session: the request's session may already be
+            # closed if the client disconnected before the reply finished
+            async with SessionLocal() as db:
+                if built.summary_changed:
+                    # Concurrent generations fold the same turns; the first
+                    # to finish saves the summary and the others leave it be
+                    await ticket_repository.update_summary(
+                        db,
+                        ticket_id=ticket_id,
+                        summary=built.summary,
+                        summarized_until=built.summarized_until,
+                        previous_until=built.previous_summarized_until
+                    )
+                ai_message = MessageCreate(content=content, is_ai=True)
+                await ticket_repository.add_message(
+                    db, ticket_id=ticket_id, message=ai_message, generated=True
+                )
         
-        return ticket_repository.add_message(db, ticket_id=ticket_id, message=message)
+        return persist
 
 ticket_service = TicketService()
\ No newline at end of file
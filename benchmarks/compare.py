@@ -0,0 +1,58 @@
+"""
+Compare two benchmark reports and flag latency and throughput regressions.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+# (field, True when higher is better)
+FIELDS: List[Tuple[str, bool]] = [
+    ("throughput_rps", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("ttft_p50_ms", False),
+    ("ttft_p99_ms", False),
+]
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Return one line per endpoint metric that got worse by more than `threshold`"""
+    regressions = []
+    for workload, result in current["workloads"].items():
+        before = baseline["workloads"].get(workload)
+        if before is None:
+            continue
+        for endpoint, stats in result["endpoints"].items():
+            old = before["endpoints"].get(endpoint)
+            if old is None:
+                continue
+            for name, higher_is_better in FIELDS:
+                if not old.get(name) or stats.get(name) is None:
+                    continue
+                change = (stats[name] - old[name]) / old[name]
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(
+                        f"{workload} {endpoint} {name}: {old[name]} -> {stats[name]} ({change:+.0%})"
+                    )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change to flag, default 10%%")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline, open(args.current) as current:
+        regressions = compare(json.load(baseline), json.load(current), args.threshold)
+    for line in regressions:
+        print(line)
+    if not regressions:
+        print("No regressions")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
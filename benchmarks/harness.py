@@ -0,0 +1,335 @@
+"""
+Processes, clients and measurements shared by the benchmark workloads.
+
+Every workload gets a freshly started API process and an empty database, so
+runs are independent and comparable between commits.
+"""
+import asyncio
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "benchmark-password"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of `samples`, `q` in [0, 100]"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """High-water resident set size of a process, where /proc is available"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def parse_metrics(body: str) -> Dict[str, float]:
+    """Flatten a Prometheus text exposition into {series: value}"""
+    samples = {}
+    for line in body.splitlines():
+        if line and not line.startswith("#"):
+            series, _, value = line.rpartition(" ")
+            samples[series] = float(value)
+    return samples
+
+def histogram_delta(
+    before: Dict[str, float], after: Dict[str, float], name: str, labels: str = ""
+) -> Dict[str, Any]:
+    """
+    Observations a histogram got between two scrapes: count, sum and
+    cumulative bucket counts. `labels` selects a series, e.g. 'route="/"'.
+    """
+    prefix = f'{name}_bucket{{{labels + "," if labels else ""}le="'
+    buckets = {
+        float(series[len(prefix):-2]): value - before.get(series, 0.0)
+        for series, value in after.items()
+        if series.startswith(prefix)
+    }
+    selector = f"{{{labels}}}" if labels else ""
+    delta: Dict[str, Any] = {
+        field: after.get(f"{name}_{field}{selector}", 0.0) - before.get(f"{name}_{field}{selector}", 0.0)
+        for field in ("count", "sum")
+    }
+    delta["buckets"] = dict(sorted(buckets.items()))
+    return delta
+
+def histogram_quantile(delta: Dict[str, Any], q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the q-th quantile, `q` in [0, 100]"""
+    if not delta["count"]:
+        return None
+    for bound, cumulative in delta["buckets"].items():
+        if cumulative >= q / 100 * delta["count"]:
+            return bound
+    return math.inf
+
+class Recorder:
+    """Latency, status and time-to-first-token samples per endpoint"""
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.ttfts: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        # When each endpoint was first called and last answered
+        self.windows: Dict[str, List[float]] = {}
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    def record(self, endpoint: str, status: int, seconds: float, ttft: Optional[float] = None) -> None:
+        finished_at = time.perf_counter()
+        window = self.windows.setdefault(endpoint, [finished_at - seconds, finished_at])
+        window[0] = min(window[0], finished_at - seconds)
+        window[1] = finished_at
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][str(status)] += 1
+        if ttft is not None:
+            self.ttfts[endpoint].append(ttft)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        endpoints = {}
+        for endpoint, samples in self.latencies.items():
+            first, last = self.windows[endpoint]
+            entry = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / (last - first), 2) if last > first else None,
+                "statuses": dict(self.statuses[endpoint]),
+                **{f"p{q}_ms": _ms(percentile(samples, q)) for q in (50, 95, 99)},
+            }
+            ttfts = self.ttfts.get(endpoint)
+            if ttfts:
+                entry.update({f"ttft_p{q}_ms": _ms(percentile(ttfts, q)) for q in (50, 95, 99)})
+            endpoints[endpoint] = entry
+        return {"elapsed_s": round(elapsed, 3), "endpoints": endpoints}
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+class Process:
+    """A child process started from the repository root"""
+    def __init__(self, args: List[str], env: Dict[str, str], log_path: Path):
+        self.log = open(log_path, "wb")
+        self.popen = subprocess.Popen(
+            args, cwd=ROOT, env={**os.environ, **env},
+            stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    @property
+    def pid(self) -> int:
+        return self.popen.pid
+
+    def stop(self) -> None:
+        if self.popen.poll() is None:
+            self.popen.terminate()
+            try:
+                self.popen.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.popen.kill()
+                self.popen.wait()
+        self.log.close()
+
+async def wait_until_ready(url: str, process: Process, timeout: float = 60.0) -> float:
+    """Poll `url` until it answers, returning the seconds it took"""
+    started_at = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - started_at < timeout:
+            if process.popen.poll() is not None:
+                raise RuntimeError(f"Process exited with {process.popen.returncode}, see {process.log.name}")
+            try:
+                response = await client.get(url, timeout=1.0)
+                if response.status_code < 500:
+                    return time.perf_counter() - started_at
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f} s, see {process.log.name}")
+
+class BenchContext:
+    """What a workload gets: a client to a running API and helpers to seed it"""
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        database_uri: str,
+        llm_url: str,
+        app: Process,
+        options: Dict[str, Any]
+    ):
+        self.client = client
+        self.database_uri = database_uri
+        self.llm_url = llm_url
+        self.app = app
+        self.options = options
+        self.recorder = Recorder()
+        self.extra: Dict[str, Any] = {}
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and record its latency under `endpoint`"""
+        started_at = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            self.recorder.record(endpoint, 0, time.perf_counter() - started_at)
+            raise
+        self.recorder.record(endpoint, response.status_code, time.perf_counter() - started_at)
+        return response
+
+    async def stream(self, endpoint: str, url: str, **kwargs) -> int:
+        """Read an SSE response to the end, recording time to the first data line"""
+        started_at = time.perf_counter()
+        ttft = None
+        async with self.client.stream("GET", url, **kwargs) as response:
+            async for line in response.aiter_lines():
+                if ttft is None and line.startswith("data:"):
+                    ttft = time.perf_counter() - started_at
+        self.recorder.record(endpoint, response.status_code, time.perf_counter() - started_at, ttft)
+        return response.status_code
+
+    async def _seed(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a setup request, backing off while the server sheds load"""
+        while True:
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code not in (429, 503):
+                response.raise_for_status()
+                return response
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+    async def signup(self, email: str) -> Dict[str, str]:
+        """Create a user and return its authorization headers"""
+        await self._seed("POST", "/auth/signup", json={"email": email, "password": PASSWORD})
+        return await self.login(email)
+
+    async def login(self, email: str) -> Dict[str, str]:
+        response = await self._seed("POST", "/auth/login", data={"username": email, "password": PASSWORD})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def create_admin(self, email: str) -> Dict[str, str]:
+        """Sign up a user and promote it straight in the database"""
+        await self._seed("POST", "/auth/signup", json={"email": email, "password": PASSWORD})
+        engine = create_async_engine(self.database_uri)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("UPDATE users SET role = 'admin' WHERE email = :email"), {"email": email}
+                )
+        finally:
+            await engine.dispose()
+        return await self.login(email)
+
+    async def create_ticket(self, headers: Dict[str, str], n: int = 0) -> str:
+        response = await self._seed("POST", "/tickets/", headers=headers, json={
+            "title": f"Benchmark ticket {n}",
+            "description": f"My order {n} arrived damaged and I would like a replacement.",
+        })
+        return response.json()["id"]
+
+    async def metrics(self) -> Dict[str, float]:
+        response = await self.client.get("/metrics")
+        return parse_metrics(response.text) if response.status_code == 200 else {}
+
+    async def llm_stats(self) -> Dict[str, int]:
+        """Requests and client connections the LLM stand-in has seen"""
+        response = await self.client.get(httpx.URL(self.llm_url).join("/stats"))
+        return response.json()
+
+    async def insert(self, table: str, rows: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+        """
+        Insert rows straight into the database, for datasets too big to seed
+        through the API. Rows are consumed lazily, one batch per transaction.
+        """
+        engine = create_async_engine(self.database_uri)
+        statement = _metadata().tables[table].insert()
+        rows = iter(rows)
+        inserted = 0
+        try:
+            while batch := list(islice(rows, batch_size)):
+                async with engine.begin() as conn:
+                    await conn.execute(statement, batch)
+                inserted += len(batch)
+        finally:
+            await engine.dispose()
+        return inserted
+
+def _metadata():
+    sys.path.insert(0, str(ROOT))
+    from app.db.base import Base
+    import app.db.models  # noqa: F401 (registers the tables)
+    return Base.metadata
+
+async def reset_database(database_uri: str) -> None:
+    """Drop every table so each workload starts empty; the API creates them again on startup"""
+    metadata = _metadata()
+    engine = create_async_engine(database_uri)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.drop_all)
+    finally:
+        await engine.dispose()
+
+@asynccontextmanager
+async def running_app(
+    database_uri: str,
+    llm_url: str,
+    env: Dict[str, str],
+    options: Dict[str, Any],
+    log_dir: Path
+) -> AsyncIterator[BenchContext]:
+    """Start the API on an empty database and yield a context bound to it"""
+    if database_uri.startswith("sqlite"):
+        path = make_url(database_uri).database
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if path and os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    else:
+        await reset_database(database_uri)
+
+    port = free_port()
+    app_env = {
+        "DATABASE_URI": database_uri,
+        "SECRET_KEY": "benchmark-secret",
+        "GROQ_API_URL": llm_url,
+        "GROQ_API_KEY": "benchmark",
+        # Benchmarks measure capacity, not the per-user quotas: a large burst
+        # alone still runs dry after a minute at the configured rates
+        "AI_RESPONSE_RATE_PER_MINUTE": "1000000",
+        "AI_RESPONSE_BURST": "1000000",
+        "MESSAGE_RATE_PER_MINUTE": "1000000",
+        "MESSAGE_BURST": "1000000",
+        **env,
+    }
+    app = Process(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        app_env, log_dir / "app.log"
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        ready_s = await wait_until_ready(f"{base_url}/health/ready", app)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+            context = BenchContext(client, database_uri, llm_url, app, options)
+            context.extra["startup_s"] = round(ready_s, 3)
+            yield context
+    finally:
+        app.stop()
@@ -0,0 +1,115 @@
+"""
+Cold start benchmark: how long `import app.main` takes, broken down by
+package from `python -X importtime`, and how long a fresh worker takes to
+answer /health/live and /health/ready.
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.harness import ROOT, Process, free_port
+
+def import_breakdown(env: Dict[str, str]) -> Dict[str, Any]:
+    """Import app.main in a fresh interpreter, returning total and per-package self time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, check=True
+    )
+    packages: Dict[str, int] = defaultdict(int)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        name = module.strip()
+        packages[name.split(".")[0]] += int(self_us)
+        if name == "app.main":
+            total_us = int(cumulative_us)
+    return {"total_us": total_us, "packages_us": dict(packages)}
+
+async def time_to_ready(env: Dict[str, str], log_path: Path) -> Dict[str, float]:
+    """Start a worker and time the first 200 from the liveness and readiness probes"""
+    port = free_port()
+    started_at = time.perf_counter()
+    app = Process(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env, log_path
+    )
+    timings: Dict[str, float] = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            while len(timings) < 2 and time.perf_counter() - started_at < 60:
+                if app.popen.poll() is not None:
+                    raise RuntimeError(f"Worker exited with {app.popen.returncode}, see {log_path}")
+                for probe in ("live", "ready"):
+                    if probe in timings:
+                        continue
+                    try:
+                        response = await client.get(f"/health/{probe}", timeout=1.0)
+                    except httpx.TransportError:
+                        break
+                    if response.status_code == 200:
+                        timings[probe] = time.perf_counter() - started_at
+                await asyncio.sleep(0.01)
+    finally:
+        app.stop()
+    return timings
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-uri", help="default: a throwaway SQLite file")
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the breakdown")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="support-startup-"))
+    env = {
+        "DATABASE_URI": args.database_uri or f"sqlite+aiosqlite:///{workdir / 'startup.db'}",
+        "SECRET_KEY": "benchmark-secret",
+    }
+
+    imports = [import_breakdown(env) for _ in range(args.runs)]
+    packages: Dict[str, List[int]] = defaultdict(list)
+    for run in imports:
+        for package, self_us in run["packages_us"].items():
+            packages[package].append(self_us)
+    breakdown = sorted(
+        ((package, statistics.median(samples) / 1000) for package, samples in packages.items()),
+        key=lambda item: item[1], reverse=True
+    )
+
+    boots = [asyncio.run(time_to_ready(env, workdir / f"app-{n}.log")) for n in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(run["total_us"] for run in imports) / 1000, 1),
+        "import_ms_by_package": {package: round(ms, 1) for package, ms in breakdown[:args.top]},
+        **{
+            f"time_to_{probe}_ms_median": round(statistics.median(boot[probe] for boot in boots) * 1000, 1)
+            for probe in ("live", "ready")
+            if all(probe in boot for boot in boots)
+        },
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API, such as Groq's.
+
+Replies are generated locally with configurable latency, so benchmarks measure
+this service rather than the provider:
+
+    python -m benchmarks.stub_llm --port 8765 --ttft 0.2 --tokens-per-second 80
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+def create_app(
+    ttft: float,
+    tokens_per_second: float,
+    tokens: int,
+    error_rate: float,
+    jitter: float
+) -> web.Application:
+    # Client sockets are told apart by their address, so a benchmark can
+    # tell how well the API reuses its connections
+    peers = set()
+    stats = {"requests": 0, "connections": 0}
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer not in peers:
+            peers.add(peer)
+            stats["connections"] += 1
+        stats["requests"] += 1
+        body = await request.json()
+        if random.random() < error_rate:
+            return web.json_response({"error": {"message": "injected failure"}}, status=500)
+
+        await asyncio.sleep(max(0.0, random.gauss(ttft, ttft * jitter)))
+        words = [f"word{i} " for i in range(tokens)]
+        delay = 1 / tokens_per_second if tokens_per_second > 0 else 0
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay * tokens)
+            return web.json_response({"choices": [{"message": {"content": "".join(words)}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in words:
+            event = {"choices": [{"delta": {"content": word}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            await asyncio.sleep(delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with a 500")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative standard deviation of the TTFT")
+    args = parser.parse_args()
+
+    app = create_app(args.ttft, args.tokens_per_second, args.tokens, args.error_rate, args.jitter)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
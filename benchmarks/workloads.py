@@ -0,0 +1,466 @@
+"""
+Scripted workloads. Each one runs against its own API process, started with
+the workload's environment overrides on an empty database.
+"""
+import asyncio
+import gzip
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.harness import BenchContext, histogram_delta, histogram_quantile, peak_rss_mb, percentile
+
+@dataclass
+class Workload:
+    name: str
+    run: Callable[[BenchContext], Awaitable[None]]
+    env: Dict[str, str] = field(default_factory=dict)
+    # Prefixes of /metrics series to copy into the report
+    metrics: Tuple[str, ...] = ()
+
+WORKLOADS: Dict[str, Workload] = {}
+
+def workload(name: str, env: Dict[str, str] = None, metrics: Tuple[str, ...] = ()):
+    def register(run: Callable[[BenchContext], Awaitable[None]]):
+        WORKLOADS[name] = Workload(name, run, env or {}, metrics)
+        return run
+    return register
+
+async def gather_limited(concurrency: int, jobs: List[Callable[[], Awaitable[None]]]) -> None:
+    """Run `jobs` with at most `concurrency` in flight, keeping errors in the stats"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job: Callable[[], Awaitable[None]]) -> None:
+        async with semaphore:
+            try:
+                await job()
+            except Exception:
+                # Failures are already recorded as statuses
+                pass
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+async def seed_users(ctx: BenchContext, count: int, tickets_per_user: int) -> List[Tuple[Dict[str, str], List[str]]]:
+    """Create users with tickets, returning (headers, ticket ids) per user"""
+    async def seed(n: int) -> Tuple[Dict[str, str], List[str]]:
+        headers = await ctx.signup(f"user{n}-{uuid.uuid4().hex[:8]}@bench.example.com")
+        tickets = [await ctx.create_ticket(headers, i) for i in range(tickets_per_user)]
+        return headers, tickets
+
+    semaphore = asyncio.Semaphore(8)
+
+    async def limited(n: int) -> Tuple[Dict[str, str], List[str]]:
+        async with semaphore:
+            return await seed(n)
+
+    return await asyncio.gather(*(limited(n) for n in range(count)))
+
+@workload("auth_storm")
+async def auth_storm(ctx: BenchContext) -> None:
+    """Concurrent sign-ups, each followed by a login"""
+    async def user(n: int) -> None:
+        email = f"storm{n}@bench.example.com"
+        password = {"password": "benchmark-password"}
+        await ctx.request("POST /auth/signup", "POST", "/auth/signup", json={"email": email, **password})
+        await ctx.request(
+            "POST /auth/login", "POST", "/auth/login",
+            data={"username": email, "password": password["password"]}
+        )
+
+    users = ctx.options["users"]
+    await gather_limited(ctx.options["concurrency"], [lambda n=n: user(n) for n in range(users)])
+
+async def ticket_polling(ctx: BenchContext, revalidate: bool) -> None:
+    """Clients polling their ticket list and a ticket's detail, revalidating with ETags when `revalidate`"""
+    users = await seed_users(ctx, ctx.options["concurrency"], tickets_per_user=20)
+    for headers, tickets in users:
+        for i in range(10):
+            await ctx.client.post(f"/tickets/{tickets[0]}/messages", headers=headers, json={"content": f"Message {i}"})
+    before = await ctx.metrics()
+    ctx.recorder.started_at = time.perf_counter()
+    deadline = ctx.recorder.started_at + ctx.options["duration"]
+    received = 0
+
+    async def poller(headers: Dict[str, str], tickets: List[str]) -> None:
+        nonlocal received
+        etags: Dict[str, str] = {}
+        while time.perf_counter() < deadline:
+            for endpoint, url in (
+                ("GET /tickets/", "/tickets/"),
+                ("GET /tickets/{ticket_id}", f"/tickets/{random.choice(tickets[:3])}"),
+            ):
+                request_headers = {**headers, **({"If-None-Match": etags[url]} if url in etags else {})}
+                response = await ctx.request(endpoint, "GET", url, headers=request_headers)
+                received += len(response.content)
+                if revalidate and "etag" in response.headers:
+                    etags[url] = response.headers["etag"]
+
+    await asyncio.gather(*(poller(headers, tickets) for headers, tickets in users))
+    after = await ctx.metrics()
+    requests = sum(len(ctx.recorder.latencies[endpoint]) for endpoint in ctx.recorder.latencies)
+    db_seconds = sum(
+        histogram_delta(before, after, "db_seconds_per_request", f'route="{route}"')["sum"]
+        for route in ("/tickets/", "/tickets/{ticket_id}")
+    )
+    ctx.extra.update({
+        "response_bytes_per_request": round(received / requests) if requests else None,
+        "db_ms_per_request": round(db_seconds * 1000 / requests, 3) if requests else None,
+    })
+
+workload("ticket_polling")(lambda ctx: ticket_polling(ctx, revalidate=True))
+workload("ticket_polling_no_etag")(lambda ctx: ticket_polling(ctx, revalidate=False))
+
+async def message_burst(ctx: BenchContext) -> None:
+    """Bursts of messages from 1, 10 and 100 concurrent writers, each its own user and ticket"""
+    total = ctx.options["messages"]
+    levels = (1, 10, 100)
+    # Per-user limits and caches must not couple the writers
+    tickets = [(headers, ids[0]) for headers, ids in await seed_users(ctx, max(levels), tickets_per_user=1)]
+
+    for writers in levels:
+        endpoint = f"POST /tickets/{{ticket_id}}/messages writers={writers}"
+        before = await ctx.metrics()
+        sent = errors = 0
+        started_at = time.perf_counter()
+
+        async def writer(headers: Dict[str, str], ticket: str, count: int) -> None:
+            nonlocal sent, errors
+            for i in range(count):
+                try:
+                    response = await ctx.request(
+                        endpoint, "POST", f"/tickets/{ticket}/messages",
+                        headers=headers, json={"content": f"Burst message {i}"}
+                    )
+                except httpx.TransportError:
+                    errors += 1
+                    continue
+                if response.is_success:
+                    sent += 1
+                else:
+                    errors += 1
+
+        # Spread the remainder so exactly `total` messages are attempted
+        counts = [total // writers + (n < total % writers) for n in range(writers)]
+        await asyncio.gather(*(
+            writer(headers, ticket, count)
+            for (headers, ticket), count in zip(tickets, counts) if count
+        ))
+        elapsed = time.perf_counter() - started_at
+        after = await ctx.metrics()
+        commits = after.get("message_write_commits_total", 0) - before.get("message_write_commits_total", 0)
+        ctx.extra[f"writers={writers}"] = {
+            "messages_per_s": round(sent / elapsed, 1),
+            "errors": errors,
+            # Only counted on the write-behind path; direct inserts commit once per message
+            "writer_commits": int(commits) if after else None,
+        }
+
+workload("message_burst")(message_burst)
+workload(
+    "message_burst_write_behind",
+    env={"MESSAGE_WRITE_BEHIND_ENABLED": "true"},
+    metrics=("message_write_",)
+)(message_burst)
+
+async def ai_streams(ctx: BenchContext, streams: int) -> None:
+    """Every client posts a message and reads the streamed AI reply, all at once"""
+    users = await seed_users(ctx, min(streams, 20), tickets_per_user=max(1, -(-streams // 20)))
+    tickets = [(headers, ticket) for headers, ids in users for ticket in ids][:streams]
+    ctx.recorder.started_at = time.perf_counter()
+
+    async def client(headers: Dict[str, str], ticket: str, round_: int) -> None:
+        await ctx.request(
+            "POST /tickets/{ticket_id}/messages", "POST", f"/tickets/{ticket}/messages",
+            headers=headers, json={"content": f"Where is my order? Attempt {round_}"}
+        )
+        await ctx.stream("GET /tickets/{ticket_id}/ai-response", f"/tickets/{ticket}/ai-response", headers=headers)
+
+    for round_ in range(ctx.options["rounds"]):
+        await asyncio.gather(
+            *(client(headers, ticket, round_) for headers, ticket in tickets),
+            return_exceptions=True
+        )
+
+@workload(
+    "ai_streams",
+    env={"AI_DRAFTS_ENABLED": "false"},
+    metrics=("llm_first_token_seconds", "llm_errors_total", "llm_provider_requests_total")
+)
+async def concurrent_ai_streams(ctx: BenchContext) -> None:
+    await ai_streams(ctx, ctx.options["streams"])
+
+@workload(
+    "ai_overload",
+    env={
+        "AI_DRAFTS_ENABLED": "false",
+        "LLM_MAX_CONCURRENCY": "8",
+        "LLM_MAX_QUEUE": "16",
+        "LLM_QUEUE_TIMEOUT_SECONDS": "2",
+    },
+    metrics=("llm_rejected_total", "llm_wait_seconds")
+)
+async def ai_overload(ctx: BenchContext) -> None:
+    """Far more concurrent streams than the LLM limiter admits; excess should be shed fast"""
+    await ai_streams(ctx, ctx.options["overload_streams"])
+
+async def ndjson_tickets(user_id: str, tickets: int, messages_per_ticket: int, **ticket) -> AsyncIterator[bytes]:
+    """Generate an import file lazily, gzip compressed, in about 64 KB chunks"""
+    lines: List[bytes] = []
+    for n in range(tickets):
+        lines.append(json.dumps({
+            "user_id": user_id,
+            "title": f"Imported ticket {n}",
+            "description": "The parcel never arrived and tracking has not moved for a week.",
+            "messages": [
+                {"content": f"Message {i} about imported ticket {n}", "is_ai": i % 2 == 1}
+                for i in range(messages_per_ticket)
+            ],
+            **ticket,
+        }).encode("utf-8") + b"\n")
+        if len(lines) == 100:
+            yield gzip.compress(b"".join(lines))
+            lines = []
+        await asyncio.sleep(0)
+    if lines:
+        yield gzip.compress(b"".join(lines))
+
+async def user_id_of(ctx: BenchContext, headers: Dict[str, str]) -> str:
+    # The user id is not exposed directly; a ticket carries it
+    ticket = await ctx.create_ticket(headers)
+    detail = await ctx.client.get(f"/tickets/{ticket}", headers=headers)
+    return detail.json()["user_id"]
+
+async def create_admin(ctx: BenchContext) -> Tuple[Dict[str, str], str]:
+    headers = await ctx.create_admin("admin@bench.example.com")
+    return headers, await user_id_of(ctx, headers)
+
+@workload("export_import", env={"SIMILARITY_INDEX_ENABLED": "false"})
+async def export_import(ctx: BenchContext) -> None:
+    """Bulk import a generated NDJSON file, then export everything back"""
+    headers, user_id = await create_admin(ctx)
+    started_at = time.perf_counter()
+    response = await ctx.request(
+        "POST /admin/import", "POST", "/admin/import",
+        headers={**headers, "Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"},
+        content=ndjson_tickets(user_id, ctx.options["export_tickets"], ctx.options["messages_per_ticket"])
+    )
+    response.raise_for_status()
+    import_s = time.perf_counter() - started_at
+    imported = response.json()
+    rows = imported["tickets"] + imported["messages"]
+
+    started_at = time.perf_counter()
+    exported_bytes = exported_lines = 0
+    async with ctx.client.stream("GET", "/admin/export", headers=headers) as export:
+        async for chunk in export.aiter_bytes():
+            exported_bytes += len(chunk)
+            exported_lines += chunk.count(b"\n")
+    export_s = time.perf_counter() - started_at
+    ctx.recorder.record("GET /admin/export", export.status_code, export_s)
+
+    ctx.extra.update({
+        "rows": rows,
+        "import_rows_per_s": round(rows / import_s, 1),
+        "export_rows_per_s": round(rows / export_s, 1),
+        "exported_tickets": exported_lines,
+        "exported_mb": round(exported_bytes / 2**20, 2),
+        "app_peak_rss_mb": peak_rss_mb(ctx.app.pid),
+    })
+
+@workload("bulk_status")
+async def bulk_status(ctx: BenchContext) -> None:
+    """Close every ticket resolved more than 30 days ago with one bulk request"""
+    headers, user_id = await create_admin(ctx)
+    tickets = ctx.options["bulk_tickets"]
+    resolved_at = (datetime.utcnow() - timedelta(days=60)).isoformat()
+    response = await ctx.client.post(
+        "/admin/import",
+        headers={**headers, "Content-Encoding": "gzip"},
+        content=ndjson_tickets(user_id, tickets, 0, status="resolved", updated_at=resolved_at)
+    )
+    response.raise_for_status()
+
+    ctx.recorder.started_at = time.perf_counter()
+    response = await ctx.request(
+        "POST /admin/tickets/status", "POST", "/admin/tickets/status", headers=headers,
+        json={"from_status": "resolved", "to_status": "closed", "older_than_days": 30}
+    )
+    response.raise_for_status()
+    elapsed = time.perf_counter() - ctx.recorder.started_at
+    updated = response.json()["updated"]
+    ctx.extra.update({"updated": updated, "rows_per_s": round(updated / elapsed, 1)})
+
+async def health(ctx: BenchContext) -> None:
+    """Sequential requests to the cheapest route, to expose per-request overhead"""
+    for _ in range(ctx.options["health_requests"]):
+        await ctx.request("GET /", "GET", "/")
+
+workload("health")(health)
+workload("health_no_metrics", env={"METRICS_ENABLED": "false"})(health)
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None or math.isinf(seconds) else round(seconds * 1000, 2)
+
+async def read_tickets(
+    ctx: BenchContext, endpoint: str, clients: List[Tuple[Dict[str, str], List[str]]], seconds: float
+) -> None:
+    """Every client reads one of its tickets in a loop for `seconds`, without revalidating"""
+    deadline = time.perf_counter() + seconds
+
+    async def reader(headers: Dict[str, str], tickets: List[str]) -> None:
+        while time.perf_counter() < deadline:
+            await ctx.request(endpoint, "GET", f"/tickets/{random.choice(tickets)}", headers=headers)
+
+    await asyncio.gather(*(reader(headers, tickets) for headers, tickets in clients), return_exceptions=True)
+
+async def llm_pooling(ctx: BenchContext) -> None:
+    """AI replies requested a few at a time; the LLM stand-in counts the sockets the API opens to it"""
+    concurrency = ctx.options["concurrency"]
+    users = await seed_users(ctx, concurrency, tickets_per_user=1)
+    before = await ctx.llm_stats()
+    ctx.recorder.started_at = time.perf_counter()
+
+    async def client(headers: Dict[str, str], ticket: str, count: int) -> None:
+        for i in range(count):
+            await ctx.request(
+                "POST /tickets/{ticket_id}/messages", "POST", f"/tickets/{ticket}/messages",
+                headers=headers, json={"content": f"Where is my order? Attempt {i}"}
+            )
+            await ctx.stream(
+                "GET /tickets/{ticket_id}/ai-response", f"/tickets/{ticket}/ai-response", headers=headers
+            )
+
+    per_client = max(1, ctx.options["llm_requests"] // concurrency)
+    await asyncio.gather(
+        *(client(headers, tickets[0], per_client) for headers, tickets in users), return_exceptions=True
+    )
+    after = await ctx.llm_stats()
+    upstream = after["requests"] - before["requests"]
+    sockets = after["connections"] - before["connections"]
+    ctx.extra.update({
+        "upstream_requests": upstream,
+        "sockets_per_1000_requests": round(sockets * 1000 / upstream, 1) if upstream else None,
+    })
+
+LLM_POOLING_ENV = {"AI_DRAFTS_ENABLED": "false", "SIMILARITY_INDEX_ENABLED": "false"}
+workload("llm_pooling", env=LLM_POOLING_ENV)(llm_pooling)
+# A connection is only reused within its keep-alive time, so 0 opens one per request
+workload("llm_pooling_no_keepalive", env={**LLM_POOLING_ENV, "LLM_KEEPALIVE_SECONDS": "0"})(llm_pooling)
+
+@workload("client_scaling")
+async def client_scaling(ctx: BenchContext) -> None:
+    """Ticket reads from growing numbers of concurrent clients, with the API's event loop lag at each"""
+    users = await seed_users(ctx, 50, tickets_per_user=1)
+    for level in (int(n) for n in ctx.options["client_levels"].split(",")):
+        before = await ctx.metrics()
+        clients = [users[n % len(users)] for n in range(level)]
+        await read_tickets(ctx, f"GET /tickets/{{ticket_id}} clients={level}", clients, ctx.options["duration"])
+        after = await ctx.metrics()
+
+        lag = histogram_delta(before, after, "event_loop_lag_seconds")
+        ctx.extra[f"clients={level}"] = {
+            "event_loop_lag_mean_ms": _ms(lag["sum"] / lag["count"]) if lag["count"] else None,
+            # Upper bound of the histogram bucket holding the percentile
+            "event_loop_lag_p99_ms": _ms(histogram_quantile(lag, 99)),
+        }
+
+@workload("login_storm", metrics=("password_hash_",))
+async def login_storm(ctx: BenchContext) -> None:
+    """Ticket reads before, during and after a storm of concurrent logins, which hash passwords"""
+    readers = await seed_users(ctx, ctx.options["concurrency"], tickets_per_user=1)
+    email = "storm@bench.example.com"
+    await ctx.signup(email)
+    phase_s = ctx.options["duration"] / 3
+
+    async def storm(deadline: float) -> None:
+        async def login() -> None:
+            while time.perf_counter() < deadline:
+                await ctx.request(
+                    "POST /auth/login", "POST", "/auth/login",
+                    data={"username": email, "password": "benchmark-password"}
+                )
+
+        await asyncio.gather(*(login() for _ in range(ctx.options["users"])), return_exceptions=True)
+
+    ctx.recorder.started_at = time.perf_counter()
+    await read_tickets(ctx, "GET /tickets/{ticket_id} before storm", readers, phase_s)
+    await asyncio.gather(
+        read_tickets(ctx, "GET /tickets/{ticket_id} during storm", readers, phase_s),
+        storm(time.perf_counter() + phase_s),
+    )
+    await read_tickets(ctx, "GET /tickets/{ticket_id} after storm", readers, phase_s)
+
+async def ticket_view(ctx: BenchContext) -> None:
+    """Ticket detail reads without revalidation, each loading the ticket with its newest messages"""
+    users = await seed_users(ctx, ctx.options["concurrency"], tickets_per_user=1)
+    for headers, tickets in users:
+        for i in range(ctx.options["messages_per_ticket"]):
+            await ctx.client.post(f"/tickets/{tickets[0]}/messages", headers=headers, json={"content": f"Message {i}"})
+    before = await ctx.metrics()
+    ctx.recorder.started_at = time.perf_counter()
+    await read_tickets(ctx, "GET /tickets/{ticket_id}", users, ctx.options["duration"])
+    after = await ctx.metrics()
+
+    queries = histogram_delta(before, after, "db_queries_per_request", 'route="/tickets/{ticket_id}"')
+    if queries["count"]:
+        ctx.extra["db_queries_per_request"] = round(queries["sum"] / queries["count"], 2)
+
+workload("ticket_view", metrics=("principal_cache_",))(ticket_view)
+# Entries expire as soon as they are stored, so every request looks the user up
+workload(
+    "ticket_view_no_principal_cache", env={"PRINCIPAL_CACHE_TTL_SECONDS": "0"}, metrics=("principal_cache_",)
+)(ticket_view)
+
+@workload("deep_paging")
+async def deep_paging(ctx: BenchContext) -> None:
+    """Page through every ticket of one customer, seeded straight into the database, to the last page"""
+    headers = await ctx.signup("pager@bench.example.com")
+    user_id = uuid.UUID(await user_id_of(ctx, headers))
+    count = ctx.options["paging_tickets"]
+    first_created_at = datetime.utcnow() - timedelta(seconds=count)
+    statuses = ("open", "in_progress", "resolved", "closed")
+    started_at = time.perf_counter()
+    await ctx.insert("tickets", (
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "title": f"Seeded ticket {n}",
+            "description": "The parcel never arrived and tracking has not moved for a week.",
+            "status": statuses[n % len(statuses)],
+            "created_at": first_created_at + timedelta(seconds=n),
+            "updated_at": first_created_at + timedelta(seconds=n),
+        }
+        for n in range(count)
+    ))
+    ctx.extra["seed_s"] = round(time.perf_counter() - started_at, 1)
+
+    # Latency is reported per tenth of the way through, so a slowdown with depth stands out
+    page_size = ctx.options["page_size"]
+    pages = -(-(count + 1) // page_size)
+    ctx.recorder.started_at = time.perf_counter()
+    cursor = None
+    page = 0
+    while True:
+        depth = page * 10 // pages * 10
+        params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+        response = await ctx.request(f"GET /tickets/ depth={depth}%", "GET", "/tickets/", headers=headers, params=params)
+        response.raise_for_status()
+        page += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    first = percentile(ctx.recorder.latencies["GET /tickets/ depth=0%"], 50)
+    last = percentile(ctx.recorder.latencies["GET /tickets/ depth=90%"], 50)
+    ctx.extra.update({
+        "tickets": count + 1,
+        "pages": page,
+        "last_to_first_p50_ratio": round(last / first, 2) if first and last else None,
+    })
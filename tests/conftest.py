@@ -0,0 +1,62 @@
+import os
+
+# Settings are read at import, so point the app at an in-memory database
+# before anything from `app` is imported
+os.environ.update(
+    DATABASE_URI="sqlite+aiosqlite://",
+    SECRET_KEY="test-secret",
+    AI_DRAFTS_ENABLED="false",
+    SIMILARITY_INDEX_ENABLED="false",
+    NOTIFY_BACKEND="memory",
+    GROQ_API_URL="http://127.0.0.1:9/v1/chat/completions",
+    CORS_ORIGINS='["http://frontend.test"]',
+)
+
+import uuid
+from typing import AsyncIterator, Dict
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.db.base import SessionLocal
+from app.db.models import User
+from app.main import app, lifespan
+
+PASSWORD = "test-password"
+
+@pytest.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    """A client for the app, running its lifespan on a fresh in-memory database"""
+    # Shutdown disposes the engine, which drops the in-memory database
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+async def signup(client: httpx.AsyncClient) -> Dict[str, str]:
+    """Create a user and return its authorization headers"""
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post("/auth/signup", json={"email": email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def signup_admin(client: httpx.AsyncClient) -> Dict[str, str]:
+    """Create a user, promote it to admin and return its authorization headers"""
+    headers = await signup(client)
+    token = headers["Authorization"].split()[1]
+    async with SessionLocal() as db:
+        user = await db.get(User, uuid.UUID(jwt.get_unverified_claims(token)["sub"]))
+        user.role = "admin"
+        await db.commit()
+    return headers
+
+async def create_ticket(client: httpx.AsyncClient, headers: Dict[str, str]) -> str:
+    response = await client.post("/tickets/", headers=headers, json={
+        "title": "Broken order",
+        "description": "My order arrived damaged and I need a replacement.",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
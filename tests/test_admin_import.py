@@ -0,0 +1,45 @@
+import json
+import uuid
+from typing import AsyncIterator, List
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.db.base import SessionLocal
+from app.db.models import Message
+from app.services.admin_service import admin_service
+
+async def upload(lines: List[dict]) -> AsyncIterator[bytes]:
+    yield "".join(json.dumps(line) + "\n" for line in lines).encode()
+
+async def test_messages_without_timestamps_keep_their_order(client):
+    ticket_id = uuid.uuid4()
+    contents = [f"message {n}" for n in range(20)]
+    result = await admin_service.import_tickets(upload([{
+        "id": str(ticket_id),
+        "user_id": str(uuid.uuid4()),
+        "title": "Imported",
+        "description": "Imported without timestamps",
+        "messages": [{"content": content, "is_ai": False} for content in contents],
+    }]), gzipped=False)
+    assert result.messages == len(contents)
+
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(Message.content, Message.created_at)
+            .where(Message.ticket_id == ticket_id)
+            .order_by(Message.created_at)
+        )).all()
+    assert [row.content for row in rows] == contents
+    assert len({row.created_at for row in rows}) == len(rows)
+
+async def test_unknown_status_is_rejected(client):
+    with pytest.raises(HTTPException) as excinfo:
+        await admin_service.import_tickets(upload([{
+            "user_id": str(uuid.uuid4()),
+            "title": "Imported",
+            "description": "Imported with a made up status",
+            "status": "weird",
+        }]), gzipped=False)
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,63 @@
+import asyncio
+import uuid
+from typing import AsyncIterator
+
+from app.services import ticket_service as ticket_service_module
+from app.services.ai_response_cache import AIResponseCache, ai_response_cache
+from app.services.response_stream import ResponseStream
+from tests.conftest import create_ticket, signup
+
+async def reply(text: str) -> AsyncIterator[str]:
+    yield text
+
+async def test_ticket_keys_stay_bounded_by_the_cache():
+    cache = AIResponseCache(max_size=2, ttl=60)
+    tickets = [uuid.uuid4() for _ in range(5)]
+    for ticket_id in tickets:
+        cache.get_or_start(ticket_id, f"key-{ticket_id}", lambda: ResponseStream(reply("Hi")))
+    assert set(cache._ticket_keys) == set(tickets[-2:])
+
+    # Expired entries are forgotten as they are found
+    cache.get_or_start(tickets[0], "short-lived", lambda: ResponseStream(reply("Hi")), ttl=0)
+    assert cache._ticket_keys[tickets[0]] == {"short-lived"}
+    assert cache._streams.get("short-lived") is None
+    assert tickets[0] not in cache._ticket_keys
+
+async def test_identical_requests_share_one_upstream_call(client, monkeypatch):
+    calls = 0
+    release = asyncio.Event()
+
+    async def generate(prompt: str) -> AsyncIterator[str]:
+        await release.wait()
+        yield "Your replacement is on its way."
+
+    def stream_prompt(prompt: str) -> AsyncIterator[str]:
+        nonlocal calls
+        calls += 1
+        return generate(prompt)
+
+    monkeypatch.setattr(ticket_service_module.ai_service, "stream_prompt", stream_prompt)
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    requests = [
+        asyncio.create_task(client.get(f"/tickets/{ticket_id}/ai-response", headers=headers))
+        for _ in range(2)
+    ]
+    for _ in range(100):
+        if len(ai_response_cache._ticket_keys.get(uuid.UUID(ticket_id), ())) and calls:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    release.set()
+    responses = await asyncio.gather(*requests)
+    assert [response.status_code for response in responses] == [200, 200]
+    assert responses[0].text == responses[1].text
+    assert calls == 1
+
+    # A new message moves the conversation on, so the cached reply is dropped
+    (key,) = ai_response_cache._ticket_keys[uuid.UUID(ticket_id)]
+    response = await client.post(f"/tickets/{ticket_id}/messages", headers=headers, json={"content": "Thanks"})
+    assert response.status_code == 200, response.text
+    assert key not in ai_response_cache._streams
+    assert uuid.UUID(ticket_id) not in ai_response_cache._ticket_keys
@@ -0,0 +1,110 @@
+import asyncio
+from typing import AsyncGenerator, List
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from app.services.ai_service import AIService
+from app.services.llm_providers import LLMProvider, ProviderError
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name: str, fail: bool = False, delay: float = 0.0):
+        super().__init__(name, "fake", first_token_timeout=5.0, failure_threshold=1, reset_timeout=0.05)
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    async def complete(self, session, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ProviderError(f"{self.name} failed")
+        return self.name
+
+    async def stream(self, session, prompt: str) -> AsyncGenerator[str, None]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ProviderError(f"{self.name} failed")
+        yield self.name
+
+async def open_fallback(primary: FakeProvider, fallback: FakeProvider) -> None:
+    """Trip the fallback's breaker and wait until it is due a trial call"""
+    fallback.breaker.record_failure()
+    assert fallback.breaker.state == OPEN
+    await asyncio.sleep(fallback.breaker.reset_timeout)
+
+async def test_unused_fallback_keeps_its_trial_call():
+    primary, fallback = FakeProvider("primary"), FakeProvider("fallback")
+    service = AIService(providers=[primary, fallback])
+    await open_fallback(primary, fallback)
+    try:
+        assert await service.complete_prompt("hello") == "primary"
+        # The fallback was never called, so it must not be stuck half open
+        assert fallback.breaker.state == OPEN
+        
+        primary.fail = True
+        assert await service.complete_prompt("hello") == "fallback"
+        assert fallback.calls == 1
+        assert fallback.breaker.state == CLOSED
+    finally:
+        await service.close()
+
+async def test_cancelled_hedge_gives_back_its_trial_call(monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr("app.core.config.settings.LLM_HEDGE_INITIAL_DELAY_SECONDS", 0.01)
+    primary, fallback = FakeProvider("primary", delay=0.05), FakeProvider("fallback", delay=1.0)
+    service = AIService(providers=[primary, fallback])
+    await open_fallback(primary, fallback)
+    try:
+        chunks: List[str] = [chunk async for chunk in service.stream_prompt("hello")]
+        assert chunks == ["primary"]
+        # The hedge to the fallback claimed its trial call and lost the race
+        assert fallback.calls == 1
+        assert fallback.breaker.state == OPEN
+        assert fallback.breaker.available
+    finally:
+        await service.close()
+
+async def test_all_providers_failing_is_an_error():
+    service = AIService(providers=[FakeProvider("primary", fail=True), FakeProvider("fallback", fail=True)])
+    try:
+        with pytest.raises(HTTPException):
+            await service.complete_prompt("hello")
+    finally:
+        await service.close()
+
+class BrokenProvider(FakeProvider):
+    async def stream(self, session, prompt: str) -> AsyncGenerator[str, None]:
+        self.calls += 1
+        raise RuntimeError("unexpected")
+        yield
+
+async def test_unexpected_error_settles_trial_call():
+    primary, fallback = BrokenProvider("primary"), FakeProvider("fallback")
+    service = AIService(providers=[primary, fallback])
+    # Due a trial call
+    primary.breaker.record_failure()
+    await asyncio.sleep(primary.breaker.reset_timeout)
+    try:
+        chunks: List[str] = [chunk async for chunk in service.stream_prompt("hello")]
+        assert chunks == ["fallback"]
+        # The failed trial call reopened the breaker instead of leaving it
+        # half open with its only call claimed forever
+        assert primary.calls == 1
+        assert primary.breaker.state == OPEN
+        await asyncio.sleep(primary.breaker.reset_timeout)
+        assert primary.breaker.available
+    finally:
+        await service.close()
+
+def test_half_open_breaker_admits_one_call():
+    provider = FakeProvider("primary")
+    provider.breaker.record_failure()
+    provider.breaker._opened_at -= provider.breaker.reset_timeout
+    assert provider.breaker.allow()
+    assert provider.breaker.state == HALF_OPEN
+    assert not provider.breaker.allow()
+    provider.breaker.release()
+    assert provider.breaker.allow()
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from typing import AsyncIterator, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.api.endpoints.tickets import _format_sse
+from app.services.ai_service import AIService, ai_service
+from app.services.llm_providers import OpenAICompatibleProvider
+from tests.conftest import create_ticket, signup
+
+CHUNKS = ["Hello", " there.\nSecond line", "\n\nLast"]
+
+@pytest.fixture
+async def llm() -> AsyncIterator[TestServer]:
+    """A chat completions API that sends the first chunk, then waits for `release`"""
+    release = asyncio.Event()
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for n, chunk in enumerate(CHUNKS):
+            event = {"choices": [{"delta": {"content": chunk}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if n == 0:
+                await release.wait()
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    server = TestServer(app)
+    await server.start_server()
+    server.release = release
+    try:
+        yield server
+    finally:
+        release.set()
+        await server.close()
+
+def provider_for(server: TestServer) -> OpenAICompatibleProvider:
+    return OpenAICompatibleProvider(
+        "stub", api_url=str(server.make_url("/v1/chat/completions")), api_key="test", model="stub",
+        first_token_timeout=5.0, failure_threshold=5, reset_timeout=30.0
+    )
+
+async def test_chunks_arrive_as_they_are_generated(llm):
+    service = AIService([provider_for(llm)])
+    chunks = service.stream_prompt("Where is my order?")
+    try:
+        # The upstream is still holding the rest of the reply back
+        assert await asyncio.wait_for(chunks.__anext__(), timeout=5.0) == CHUNKS[0]
+        llm.release.set()
+        assert [chunk async for chunk in chunks] == CHUNKS[1:]
+    finally:
+        await chunks.aclose()
+        await service.close()
+
+def test_format_sse_frames_every_line():
+    assert _format_sse("one line") == "data: one line\n\n"
+    assert _format_sse("first\nsecond") == "data: first\ndata: second\n\n"
+    assert _format_sse("gap\n\nafter") == "data: gap\ndata: \ndata: after\n\n"
+
+def parse_sse(body: str) -> List[str]:
+    """Reassemble the data of each event, as an EventSource would"""
+    events = []
+    for block in body.split("\n\n"):
+        lines = [line[len("data: "):] for line in block.split("\n") if line.startswith("data: ")]
+        if lines:
+            events.append("\n".join(lines))
+    return events
+
+async def test_ai_response_keeps_multi_line_chunks_intact(client, llm, monkeypatch):
+    monkeypatch.setattr(ai_service.providers[0], "api_url", str(llm.make_url("/v1/chat/completions")))
+    llm.release.set()
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    response = await client.get(f"/tickets/{ticket_id}/ai-response", headers=headers)
+    assert response.status_code == 200, response.text
+    assert parse_sse(response.text) == [*CHUNKS, "[DONE]"]
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.concurrency import BoundedExecutor, ConcurrencyLimiter, OverloadedError
+
+async def settle() -> None:
+    # Acquiring goes through wait_for, which takes a few loop iterations
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+async def test_limiter_bounds_queue_and_sheds_on_timeout():
+    limiter = ConcurrencyLimiter("test_limiter", max_concurrency=1, max_queue=1, queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with limiter.slot():
+            await release.wait()
+
+    async def wait_for_slot() -> None:
+        async with limiter.slot():
+            pass
+
+    holder = asyncio.create_task(hold())
+    await settle()
+    assert limiter.running == 1
+
+    waiter = asyncio.create_task(wait_for_slot())
+    await settle()
+    assert limiter.waiting == 1
+
+    # The queue is full, so the next caller is turned away straight away
+    with pytest.raises(OverloadedError):
+        await wait_for_slot()
+
+    # The queued caller gives up once it waited queue_timeout
+    with pytest.raises(OverloadedError) as info:
+        await waiter
+    assert info.value.status_code == 503
+    assert info.value.retry_after == 0.05
+    assert limiter.waiting == 0
+
+    release.set()
+    await holder
+    assert limiter.running == 0
+    await wait_for_slot()
+
+async def test_executor_runs_off_the_event_loop():
+    executor = BoundedExecutor("test_executor", max_workers=1, max_queue=0, queue_timeout=0.05)
+    try:
+        assert await executor.run(threading.get_ident) != threading.get_ident()
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+
+        # With every worker busy and no queue, further calls are shed
+        started, release = threading.Event(), threading.Event()
+
+        def block() -> None:
+            started.set()
+            release.wait(5)
+
+        busy = asyncio.create_task(executor.run(block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        with pytest.raises(OverloadedError):
+            await executor.run(sum, [1, 2])
+        release.set()
+        await busy
+        assert await executor.run(sum, [1, 2]) == 3
+    finally:
+        executor.shutdown()
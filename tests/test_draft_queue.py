@@ -0,0 +1,25 @@
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.services.draft_queue import draft_queue
+from tests.conftest import create_ticket, signup
+
+async def test_customer_message_queues_a_draft_on_the_event_loop(client, monkeypatch):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    # A queue without workers, so the job stays put
+    queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    threads = []
+    put_nowait = queue.put_nowait
+    monkeypatch.setattr(queue, "put_nowait", lambda job: (threads.append(threading.get_ident()), put_nowait(job)))
+    monkeypatch.setattr(draft_queue, "_queue", queue)
+    monkeypatch.setattr(settings, "AI_DRAFTS_ENABLED", True)
+
+    response = await client.post(
+        f"/tickets/{ticket_id}/messages", headers=headers, json={"content": "Any update?"}
+    )
+    assert response.status_code == 200, response.text
+    assert queue.qsize() == 1
+    assert threads == [threading.get_ident()]
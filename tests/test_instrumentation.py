@@ -0,0 +1,60 @@
+import statistics
+import time
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+
+from app.core.instrumentation import MetricsMiddleware
+from app.core.metrics import metrics
+
+# Same budget as the benchmark's check against a running server, whose
+# network and server overhead this in-process comparison leaves out
+OVERHEAD_BUDGET_US = 250.0
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def health_check():
+        return {"status": "healthy"}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def call(app: FastAPI) -> float:
+    """Run one GET / through the ASGI app, returning its duration in seconds"""
+    scope: Dict[str, Any] = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"test")], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    sent: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        sent.append(message)
+
+    started_at = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - started_at
+    assert sent[0]["status"] == 200
+    return elapsed
+
+async def test_metrics_middleware_overhead_within_budget():
+    bare, instrumented = make_app(False), make_app(True)
+    for app in (bare, instrumented):
+        for _ in range(200):
+            await call(app)
+
+    # Interleaved, so drift in machine load hits both alike
+    samples: Dict[bool, List[float]] = {False: [], True: []}
+    for _ in range(2000):
+        samples[False].append(await call(bare))
+        samples[True].append(await call(instrumented))
+
+    overhead_us = (statistics.median(samples[True]) - statistics.median(samples[False])) * 1e6
+    assert overhead_us <= OVERHEAD_BUDGET_US, f"{overhead_us:.1f} us over a bare app"
+    assert 'route="/"' in metrics.render()
@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+from typing import List
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db import message_writer as message_writer_module
+from app.db.base import SessionLocal
+from app.db.message_writer import MessageWriter
+from app.db.models import Message
+from app.schemas.message import MessageCreate
+from tests.conftest import create_ticket, signup
+
+@pytest.fixture
+async def ticket_id(client) -> uuid.UUID:
+    return uuid.UUID(await create_ticket(client, await signup(client)))
+
+def recording(writer: MessageWriter) -> List[int]:
+    """Record the size of every batch the writer flushes"""
+    batches: List[int] = []
+    flush = writer._flush
+
+    async def record(batch):
+        batches.append(len(batch))
+        await flush(batch)
+
+    writer._flush = record
+    return batches
+
+async def count_messages(ticket_id: uuid.UUID) -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).where(Message.ticket_id == ticket_id))
+
+async def test_full_batch_flushes_without_waiting(ticket_id):
+    writer = MessageWriter(batch_size=3, flush_interval=60, max_buffer=100)
+    batches = recording(writer)
+    await writer.start()
+    try:
+        messages = await asyncio.wait_for(asyncio.gather(*(
+            writer.submit(ticket_id, MessageCreate(content=f"Message {n}")) for n in range(3)
+        )), timeout=5)
+    finally:
+        await writer.stop()
+    assert batches == [3]
+
+    # Waiters get the rows as persisted, in submission order
+    async with SessionLocal() as db:
+        rows = (await db.scalars(
+            select(Message).where(Message.ticket_id == ticket_id).order_by(Message.created_at)
+        )).all()
+    assert [message.id for message in messages] == [row.id for row in rows]
+    assert [message.content for message in messages] == ["Message 0", "Message 1", "Message 2"]
+
+async def test_partial_batch_flushes_after_interval(ticket_id):
+    writer = MessageWriter(batch_size=100, flush_interval=0.05, max_buffer=100)
+    batches = recording(writer)
+    await writer.start()
+    try:
+        await asyncio.wait_for(asyncio.gather(
+            writer.submit(ticket_id, MessageCreate(content="First")),
+            writer.submit(ticket_id, MessageCreate(content="Second")),
+        ), timeout=5)
+    finally:
+        await writer.stop()
+    assert batches == [2]
+    assert await count_messages(ticket_id) == 2
+
+async def test_failed_flush_fails_every_waiter(ticket_id, monkeypatch):
+    async def fail(db, events):
+        raise RuntimeError("notify failed")
+
+    monkeypatch.setattr(message_writer_module.message_broker, "before_commit", fail)
+    writer = MessageWriter(batch_size=3, flush_interval=60, max_buffer=100)
+    await writer.start()
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*(
+            writer.submit(ticket_id, MessageCreate(content=f"Message {n}")) for n in range(3)
+        ), return_exceptions=True), timeout=5)
+    finally:
+        await writer.stop()
+    assert [type(result) for result in results] == [RuntimeError] * 3
+    assert await count_messages(ticket_id) == 0
+
+async def test_stop_writes_everything_buffered(ticket_id):
+    writer = MessageWriter(batch_size=4, flush_interval=60, max_buffer=100)
+    await writer.start()
+    for n in range(10):
+        await writer.submit(ticket_id, MessageCreate(content=f"Message {n}"), durable=False)
+    await writer.stop()
+    assert await count_messages(ticket_id) == 10
@@ -0,0 +1,84 @@
+import asyncio
+import gc
+import json
+import uuid
+
+from app.db.notifications import MAX_INLINE_PAYLOAD_BYTES, PostgresMessageBroker, message_broker, pack_payloads
+from tests.conftest import create_ticket, signup
+
+async def test_pending_loads_are_kept_until_done(monkeypatch):
+    broker = PostgresMessageBroker("postgresql://unused", max_queue=10)
+    ticket_id = uuid.uuid4()
+    subscription = broker.subscribe(ticket_id)
+    release = asyncio.Event()
+
+    async def load_and_fan_out(event):
+        await release.wait()
+        broker.fan_out({**event, "content": "Loaded"})
+
+    monkeypatch.setattr(broker, "_load_and_fan_out", load_and_fan_out)
+    # Too large to inline, so the notification only carries the ids
+    broker._on_notification(None, 0, "ticket_messages", json.dumps([{"id": str(uuid.uuid4()), "ticket_id": str(ticket_id)}]))
+    assert len(broker._loading) == 1
+
+    gc.collect()
+    release.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert not broker._loading
+    assert subscription.queue.get_nowait()["content"] == "Loaded"
+
+async def test_stop_cancels_pending_loads(monkeypatch):
+    broker = PostgresMessageBroker("postgresql://unused", max_queue=10)
+    ticket_id = uuid.uuid4()
+    broker.subscribe(ticket_id)
+    monkeypatch.setattr(broker, "_load_and_fan_out", lambda event: asyncio.sleep(60))
+
+    broker._on_notification(None, 0, "ticket_messages", json.dumps([{"id": str(uuid.uuid4()), "ticket_id": str(ticket_id)}]))
+    task = next(iter(broker._loading))
+    await broker.stop()
+    assert task.cancelled()
+
+def test_batch_is_packed_into_one_payload():
+    ticket_id = str(uuid.uuid4())
+    events = [
+        {"id": str(uuid.uuid4()), "ticket_id": ticket_id, "content": f"Message {n}"} for n in range(20)
+    ]
+    oversized = {"id": str(uuid.uuid4()), "ticket_id": ticket_id, "content": "x" * MAX_INLINE_PAYLOAD_BYTES}
+
+    payloads = pack_payloads(events + [oversized])
+    assert len(payloads) == 1
+    assert json.loads(payloads[0]) == events + [{"id": oversized["id"], "ticket_id": ticket_id}]
+
+    payloads = pack_payloads([{**event, "content": "x" * 3000} for event in events])
+    assert all(len(payload.encode("utf-8")) <= MAX_INLINE_PAYLOAD_BYTES for payload in payloads)
+    assert sum(len(json.loads(payload)) for payload in payloads) == len(events)
+
+async def test_reconnect_resyncs_every_subscriber(monkeypatch):
+    broker = PostgresMessageBroker("postgresql://unused", max_queue=10)
+
+    async def connect():
+        pass
+
+    monkeypatch.setattr(broker, "_connect", connect)
+    idle = broker.subscribe(uuid.uuid4())
+    busy = broker.subscribe(uuid.uuid4())
+    busy.offer({"id": str(uuid.uuid4()), "ticket_id": str(busy.ticket_id), "content": "Hi"})
+
+    await broker._reconnect()
+    assert idle.overflowed and busy.overflowed
+    # A consumer waiting on an empty queue is woken up to resync
+    assert await asyncio.wait_for(idle.queue.get(), timeout=1) is None
+
+async def test_events_stream_ends_with_resync(client):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    request = asyncio.create_task(client.get(f"/tickets/{ticket_id}/events", headers=headers))
+    for _ in range(100):
+        if message_broker.has_subscribers(uuid.UUID(ticket_id)):
+            break
+        await asyncio.sleep(0.01)
+
+    message_broker.resync_all()
+    response = await asyncio.wait_for(request, timeout=5)
+    assert response.text == "event: resync\ndata: {}\n\n"
@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from app.db.base import SessionLocal
+from app.db.models import Message, Ticket
+from app.db.repositories.ticket_repository import ticket_repository
+from app.services.prompt_builder import PromptBuilder, count_tokens
+from tests.conftest import create_ticket, signup
+
+STARTED_AT = datetime(2024, 1, 1)
+
+def make_ticket(description: str = "My order arrived damaged and I need a replacement.") -> Ticket:
+    return Ticket(id=uuid.uuid4(), title="Broken order", description=description)
+
+def make_messages(count: int, start: int = 0) -> List[Message]:
+    return [
+        Message(
+            id=uuid.uuid4(),
+            content=f"Turn {n} says something. It goes on about the order for a while longer.",
+            is_ai=n % 2 == 1,
+            created_at=STARTED_AT + timedelta(minutes=n)
+        )
+        for n in range(start, start + count)
+    ]
+
+def test_under_budget_keeps_every_turn():
+    builder = PromptBuilder(max_tokens=1000, summary_max_tokens=100)
+    messages = make_messages(3)
+
+    built = builder.build(make_ticket(), messages)
+    assert built.verbatim_messages == 3
+    assert built.summary is None
+    assert not built.summary_changed
+    assert built.summarized_until is None
+    assert all(message.content in built.prompt for message in messages)
+
+def test_over_budget_folds_oldest_turns_into_summary():
+    builder = PromptBuilder(max_tokens=300, summary_max_tokens=60)
+    messages = make_messages(20)
+
+    built = builder.build(make_ticket(), messages)
+    assert built.summary_changed
+    assert 0 < built.verbatim_messages < 20
+    folded = messages[:20 - built.verbatim_messages]
+    assert built.summarized_until == folded[-1].created_at
+    assert count_tokens(built.summary) <= 60
+    # The newest summary lines survive trimming
+    assert built.summary.split("\n")[-1] == builder._summarize_turn(folded[-1])
+    assert messages[-1].content in built.prompt
+    assert built.prompt_tokens <= 300
+
+def test_description_over_budget_still_keeps_latest_turn():
+    builder = PromptBuilder(max_tokens=100, summary_max_tokens=20)
+    messages = make_messages(4)
+    messages[-1].is_ai = False
+
+    built = builder.build(make_ticket(" ".join(["damaged"] * 500)), messages)
+    assert built.verbatim_messages == 1
+    assert built.summarized_until == messages[-2].created_at
+    assert f"Customer's latest message: {messages[-1].content}" in built.prompt
+
+def test_rebuild_from_saved_summary_is_stable():
+    builder = PromptBuilder(max_tokens=300, summary_max_tokens=200)
+    ticket = make_ticket()
+    messages = make_messages(20)
+
+    first = builder.build(ticket, messages)
+    assert first.summary_changed
+    ticket.summary, ticket.summarized_until = first.summary, first.summarized_until
+
+    # Same conversation: nothing new to fold, same prompt
+    second = builder.build(ticket, messages)
+    assert not second.summary_changed
+    assert second.prompt == first.prompt
+    assert second.previous_summarized_until == first.summarized_until
+
+    # The summary is extended, never recomputed
+    third = builder.build(ticket, messages + make_messages(6, start=20))
+    assert third.summary_changed
+    assert third.summary.startswith(first.summary)
+    assert third.summarized_until > first.summarized_until
+
+async def test_update_summary_only_moves_from_the_expected_point(client):
+    ticket_id = uuid.UUID(await create_ticket(client, await signup(client)))
+    async with SessionLocal() as db:
+        assert await ticket_repository.update_summary(
+            db, ticket_id=ticket_id, summary="- Customer: First.",
+            summarized_until=STARTED_AT, previous_until=None
+        )
+        # A concurrent build that started from the old summary loses
+        assert not await ticket_repository.update_summary(
+            db, ticket_id=ticket_id, summary="- Customer: Other.",
+            summarized_until=STARTED_AT, previous_until=None
+        )
+        ticket = await ticket_repository.get(db, ticket_id)
+        assert ticket.summary == "- Customer: First."
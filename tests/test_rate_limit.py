@@ -0,0 +1,80 @@
+import types
+
+import pytest
+
+from app.api.endpoints import tickets as tickets_endpoint
+from app.core import rate_limit
+from app.core.concurrency import OverloadedError
+from app.core.rate_limit import TokenBucketLimiter
+from tests.conftest import create_ticket, signup
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+def rejection(limiter: TokenBucketLimiter, key: str) -> OverloadedError:
+    with pytest.raises(OverloadedError) as info:
+        limiter.check(key)
+    return info.value
+
+def test_bucket_bursts_then_refills_at_rate(clock):
+    limiter = TokenBucketLimiter("test_refill", rate=2.0, burst=3, max_keys=10)
+    for _ in range(3):
+        limiter.check("alice")
+    error = rejection(limiter, "alice")
+    assert error.status_code == 429
+    assert error.retry_after == pytest.approx(0.5)
+
+    clock.now += 0.25
+    assert rejection(limiter, "alice").retry_after == pytest.approx(0.25)
+    clock.now += 0.25
+    limiter.check("alice")
+
+    # Idle time refills up to the burst, never beyond it
+    clock.now += 3600
+    for _ in range(3):
+        limiter.check("alice")
+    rejection(limiter, "alice")
+
+def test_keys_have_their_own_buckets(clock):
+    limiter = TokenBucketLimiter("test_keys", rate=1.0, burst=1, max_keys=2)
+    limiter.check("alice")
+    rejection(limiter, "alice")
+    limiter.check("bob")
+
+    # Beyond max_keys the least recently used bucket is forgotten and
+    # starts over full
+    limiter.check("carol")
+    assert len(limiter._buckets) == 2
+    limiter.check("alice")
+
+async def test_message_rate_limit_returns_429(client, monkeypatch):
+    limiter = TokenBucketLimiter("test_messages", rate=1 / 60, burst=1, max_keys=10)
+    monkeypatch.setattr(tickets_endpoint, "message_rate_limiter", limiter)
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    response = await client.post(f"/tickets/{ticket_id}/messages", headers=headers, json={"content": "Hi"})
+    assert response.status_code == 200, response.text
+    response = await client.post(f"/tickets/{ticket_id}/messages", headers=headers, json={"content": "Hi"})
+    assert response.status_code == 429
+    assert 59 <= int(response.headers["Retry-After"]) <= 60
+
+async def test_ai_response_rate_limit_returns_429(client, monkeypatch):
+    limiter = TokenBucketLimiter("test_ai_responses", rate=0.5, burst=0, max_keys=10)
+    monkeypatch.setattr(tickets_endpoint, "ai_response_rate_limiter", limiter)
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    response = await client.get(f"/tickets/{ticket_id}/ai-response", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
@@ -0,0 +1,38 @@
+import asyncio
+
+from app.core.readiness import Readiness
+
+async def test_restart_waits_for_the_new_run():
+    readiness = Readiness(max_retry_interval=1.0, check_timeout=1.0)
+    started = asyncio.Event()
+
+    async def initialize() -> None:
+        started.set()
+
+    readiness.start(initialize)
+    assert await readiness.wait(1.0)
+    await readiness.stop()
+
+    # e.g. a second lifespan in the same process
+    started.clear()
+    readiness.start(initialize)
+    assert not readiness.ready
+    assert await readiness.wait(1.0)
+    assert started.is_set()
+    await readiness.stop()
+
+async def test_failures_are_retried_and_reported():
+    readiness = Readiness(max_retry_interval=0.01, check_timeout=1.0)
+    attempts = []
+
+    async def initialize() -> None:
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise ConnectionError("database down")
+
+    readiness.start(initialize)
+    assert not await readiness.wait(0.1)
+    assert "database down" in readiness.last_error
+    assert await readiness.wait(2.0)
+    assert readiness.last_error is None
+    await readiness.stop()
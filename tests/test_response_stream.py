@@ -0,0 +1,49 @@
+import asyncio
+import uuid
+from typing import AsyncIterator
+
+from app.services.response_stream import ResponseStream
+from app.services.stream_store import ResponseStreamStore
+
+async def slow_source(chunks: int, delay: float = 0.01) -> AsyncIterator[str]:
+    for i in range(chunks):
+        await asyncio.sleep(delay)
+        yield f"chunk{i} "
+
+async def test_resume_replays_missed_chunks():
+    store = ResponseStreamStore(max_bytes=10_000, ttl=60)
+    ticket_id = uuid.uuid4()
+    stream = ResponseStream(slow_source(3))
+    store.add(ticket_id, stream)
+    await stream.wait()
+
+    resumed = store.resume(ticket_id, f"{stream.id}:0")
+    assert resumed == (stream, 1)
+    chunks = [chunk async for _, chunk in stream.subscribe(resumed[1])]
+    assert chunks == ["chunk1 ", "chunk2 "]
+
+async def test_resume_ignores_unknown_and_foreign_ids():
+    store = ResponseStreamStore(max_bytes=10_000, ttl=60)
+    stream = ResponseStream(slow_source(1))
+    store.add(uuid.uuid4(), stream)
+    assert store.resume(uuid.uuid4(), f"{stream.id}:0") is None
+    assert store.resume(uuid.uuid4(), "unknown:0") is None
+    assert store.resume(uuid.uuid4(), "not-an-event-id") is None
+    await stream.wait()
+
+async def test_resume_after_cancel_on_disconnect_starts_over():
+    store = ResponseStreamStore(max_bytes=10_000, ttl=60)
+    ticket_id = uuid.uuid4()
+    stream = ResponseStream(slow_source(100), cancel_on_disconnect=True)
+    store.add(ticket_id, stream)
+
+    # The only reader drops after the first chunk, which cancels the generation
+    reader = stream.subscribe()
+    index, _ = await reader.__anext__()
+    await reader.aclose()
+    assert stream.error is not None
+
+    # The reconnect must not attach to the cancelled generation
+    assert store.resume(ticket_id, f"{stream.id}:{index}") is None
+    await asyncio.sleep(0.05)
+    assert stream.done
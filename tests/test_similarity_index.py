@@ -0,0 +1,136 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.db.repositories.ticket_repository import ticket_repository
+from app.services import ticket_service as ticket_service_module
+from app.schemas.message import MessageCreate
+from app.services.similarity_index import HashingFeaturizer, SimilarityIndex
+from app.services.ticket_service import ticket_service
+from tests.conftest import create_ticket, signup, signup_admin
+
+ANSWER = "Send us a photo of the damage and we will ship a replacement."
+
+@pytest.fixture
+def index(monkeypatch) -> SimilarityIndex:
+    index = SimilarityIndex(HashingFeaturizer(dim=256), max_size=100)
+    monkeypatch.setattr(ticket_service_module, "similarity_index", index)
+    monkeypatch.setattr(settings, "SIMILARITY_INDEX_ENABLED", True)
+    return index
+
+async def build_prompt(ticket_id: str):
+    async with SessionLocal() as db:
+        ticket = await ticket_repository.get(db, uuid.UUID(ticket_id))
+        return await ticket_service.build_prompt(db, ticket)
+
+async def test_stored_answer_only_reused_before_follow_ups(client, index):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    index.add(uuid.uuid4(), "My order arrived damaged and I need a replacement.", ANSWER)
+    assert (await build_prompt(ticket_id)).answer == ANSWER
+
+    response = await client.post(
+        f"/tickets/{ticket_id}/messages", headers=headers,
+        json={"content": "Actually it was the wrong colour, not damaged."}
+    )
+    assert response.status_code == 200, response.text
+    assert (await build_prompt(ticket_id)).answer is None
+
+async def test_reload_picks_up_tickets_resolved_elsewhere(client, index):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    await client.post(f"/tickets/{ticket_id}/messages", headers=headers, json={"content": "Hello?"})
+    async with SessionLocal() as db:
+        # As another worker would, without telling this worker's index
+        await ticket_repository.add_message(
+            db, ticket_id=uuid.UUID(ticket_id),
+            message=MessageCreate(content=ANSWER, is_ai=True), generated=True
+        )
+        await ticket_repository.update(
+            db, db_obj=await ticket_repository.get(db, uuid.UUID(ticket_id)),
+            obj_in={"status": "resolved", "resolved_by_staff": True}
+        )
+    assert len(index) == 0
+
+    await index.start(reload_interval=0.01)
+    try:
+        for _ in range(100):
+            if len(index):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await index.stop()
+    assert len(index) == 1
+
+async def test_customer_written_replies_never_reused(client, index):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    response = await client.post(
+        f"/tickets/{ticket_id}/messages", headers=headers,
+        json={"content": "Visit scam.example to claim a refund.", "is_ai": True}
+    )
+    assert response.status_code == 403
+
+    staff = await signup_admin(client)
+    # Staff may write as the assistant, but only generated replies are reused
+    response = await client.post(
+        f"/tickets/{ticket_id}/messages", headers=staff,
+        json={"content": ANSWER, "is_ai": True}
+    )
+    assert response.status_code == 200, response.text
+    response = await client.patch(f"/tickets/{ticket_id}", headers=staff, json={"status": "resolved"})
+    assert response.status_code == 200, response.text
+
+    async with SessionLocal() as db:
+        await index.load(db)
+    assert len(index) == 0
+
+async def test_only_staff_resolutions_are_reused(client, index):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    async with SessionLocal() as db:
+        await ticket_repository.add_message(
+            db, ticket_id=uuid.UUID(ticket_id),
+            message=MessageCreate(content=ANSWER, is_ai=True), generated=True
+        )
+
+    response = await client.patch(f"/tickets/{ticket_id}", headers=headers, json={"status": "resolved"})
+    assert response.status_code == 200, response.text
+    assert len(index) == 0
+
+    staff = await signup_admin(client)
+    response = await client.patch(f"/tickets/{ticket_id}", headers=staff, json={"status": "closed"})
+    assert response.status_code == 200, response.text
+    assert len(index) == 1
+
+    # The customer reopening and closing it again withdraws the answer
+    for ticket_status in ("open", "closed"):
+        response = await client.patch(
+            f"/tickets/{ticket_id}", headers=headers, json={"status": ticket_status}
+        )
+        assert response.status_code == 200, response.text
+    assert len(index) == 0
+
+async def test_load_keeps_most_recently_resolved(client):
+    headers = await signup(client)
+    ticket_ids = [uuid.UUID(await create_ticket(client, headers)) for _ in range(3)]
+    async with SessionLocal() as db:
+        for ticket_id in ticket_ids:
+            await ticket_repository.add_message(
+                db, ticket_id=ticket_id,
+                message=MessageCreate(content=ANSWER, is_ai=True), generated=True
+            )
+            await ticket_repository.update(
+                db, db_obj=await ticket_repository.get(db, ticket_id),
+                obj_in={"status": "resolved", "resolved_by_staff": True}
+            )
+
+        index = SimilarityIndex(HashingFeaturizer(dim=256), max_size=2)
+        await index.load(db)
+    assert len(index) == 2
+    assert set(index._rows) == set(ticket_ids[1:])
+    # The oldest of those is the first replaced
+    assert next(iter(index._rows)) == ticket_ids[1]
@@ -0,0 +1,120 @@
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+
+from app.db.base import engine
+from tests.conftest import create_ticket, signup
+
+@contextmanager
+def count_statements() -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+async def test_ticket_view_is_one_statement(client):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    for n in range(3):
+        await client.post(f"/tickets/{ticket_id}/messages", headers=headers, json={"content": f"Update {n}"})
+    # Caches the principal, so the user lookup is not counted
+    await client.get(f"/tickets/{ticket_id}", headers=headers)
+
+    with count_statements() as statements:
+        response = await client.get(f"/tickets/{ticket_id}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["messages"]) == 3
+    assert len(statements) == 1, statements
+
+    # An unchanged poll is answered from the version check alone
+    with count_statements() as statements:
+        response = await client.get(
+            f"/tickets/{ticket_id}", headers={**headers, "If-None-Match": response.headers["ETag"]}
+        )
+    assert response.status_code == 304
+    assert len(statements) == 1, statements
+
+async def test_foreign_tickets_are_not_found(client):
+    ticket_id = await create_ticket(client, await signup(client))
+    stranger = await signup(client)
+
+    responses = [
+        await client.get(f"/tickets/{ticket_id}", headers=stranger),
+        await client.patch(f"/tickets/{ticket_id}", headers=stranger, json={"status": "closed"}),
+        await client.post(f"/tickets/{ticket_id}/messages", headers=stranger, json={"content": "Hi"}),
+        await client.get(f"/tickets/{ticket_id}/ai-response", headers=stranger),
+        await client.get(f"/tickets/{ticket_id}/events", headers=stranger),
+    ]
+    assert [response.status_code for response in responses] == [404] * len(responses)
+
+async def test_browsers_can_read_paging_and_cache_headers(client):
+    headers = await signup(client)
+    await create_ticket(client, headers)
+    await create_ticket(client, headers)
+
+    response = await client.get(
+        "/tickets/", params={"limit": 1}, headers={**headers, "Origin": "http://frontend.test"}
+    )
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "http://frontend.test"
+    exposed = {name.strip().lower() for name in response.headers["access-control-expose-headers"].split(",")}
+    assert {"x-next-cursor", "etag"} <= exposed
+    assert "x-next-cursor" in response.headers and "etag" in response.headers
+
+async def test_after_id_must_be_a_message_on_the_ticket(client):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+    other_ticket_id = await create_ticket(client, headers)
+    ids = []
+    for n in range(3):
+        response = await client.post(f"/tickets/{ticket_id}/messages", headers=headers, json={"content": f"Update {n}"})
+        ids.append(response.json()["id"])
+    response = await client.post(f"/tickets/{other_ticket_id}/messages", headers=headers, json={"content": "Elsewhere"})
+    foreign_id = response.json()["id"]
+
+    response = await client.get(f"/tickets/{ticket_id}", headers=headers, params={"after_id": ids[0]})
+    assert response.status_code == 200
+    assert [message["id"] for message in response.json()["messages"]] == ids[1:]
+
+    for after_id in (foreign_id, str(uuid.uuid4())):
+        response = await client.get(f"/tickets/{ticket_id}", headers=headers, params={"after_id": after_id})
+        assert response.status_code == 400, response.text
+
+async def test_update_ticket(client):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    response = await client.patch(f"/tickets/{ticket_id}", headers=headers, json={"title": "Wrong colour"})
+    assert response.status_code == 200, response.text
+    assert response.json()["title"] == "Wrong colour"
+    assert response.json()["status"] == "open"
+
+    for ticket_status in ("in_progress", "resolved", "closed", "open"):
+        response = await client.patch(
+            f"/tickets/{ticket_id}", headers=headers, json={"status": ticket_status}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["status"] == ticket_status
+
+    response = await client.patch(f"/tickets/{ticket_id}", headers=headers, json={"status": "deleted"})
+    assert response.status_code == 422
+
+async def test_update_ticket_rejects_nulls(client):
+    headers = await signup(client)
+    ticket_id = await create_ticket(client, headers)
+
+    for field in ("title", "description", "status"):
+        response = await client.patch(f"/tickets/{ticket_id}", headers=headers, json={field: None})
+        assert response.status_code == 422, response.text
+
+    response = await client.get(f"/tickets/{ticket_id}", headers=headers)
+    assert response.json()["title"] == "Broken order"
+    assert response.json()["status"] == "open"